@@ -3,53 +3,165 @@
 Módulo de autenticación y seguridad.
 Maneja la generación de tokens JWT, hashing de contraseñas y validación de usuarios.
 """
+import hashlib
 import os
-from fastapi import Depends, HTTPException, status
+import secrets
+import time
+from fastapi import Depends, Header, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from passlib.context import CryptContext
-from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
+
+from cache import LRUCache
+from hashing import password_hasher
+from metrics import JWT_SECONDS, REVOCATION_CHECKS
+from revocation import REVOKED, revocation_store
+from token_minter import TokenMinter
 
 # --- CONFIGURACIÓN DE SEGURIDAD ---
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-key-change-in-production")
-ALGORITHM = "HS256"
+# HS256 (SECRET_KEY compartida) o EdDSA/ES256 (claves en JWT_KEYS_DIR, publicadas en
+# /.well-known/jwks.json para que otros servicios verifiquen los tokens localmente)
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+JWKS_MAX_AGE = int(os.getenv("JWKS_MAX_AGE", "300"))
+
+
+def _build_signing_keys(algorithm: str):
+    """
+    Keyring asimétrico, o None con HS256. Cada worker carga solo el backend que usa:
+    con HS256 no se importan jwt_keys/jwt_verifier (cryptography) y con EdDSA/ES256
+    no se importa jose.jwt (ver _verify_token).
+    """
+    if algorithm.startswith("HS"):
+        return None
+    from jwt_keys import build_keyring
+    return build_keyring(algorithm)
+
+
+signing_keys = _build_signing_keys(ALGORITHM)
+token_minter = TokenMinter(SECRET_KEY, ALGORITHM, signing_keys)
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Vigencia del ticket de un solo uso con el que se abre /events (va en la URL)
+EVENTS_TICKET_SECONDS = int(os.getenv("EVENTS_TICKET_SECONDS", "30"))
+
+# --- CACHÉ DE TOKENS DECODIFICADOS ---
+# Evita repetir jwt.decode para el mismo token; las entradas nunca sobreviven al `exp`.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL = float(os.getenv("TOKEN_CACHE_MAX_TTL", "300"))
+token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+# jti de los tickets de /events ya usados en este proceso (hasta que caducan)
+used_events_tickets = LRUCache(maxsize=TOKEN_CACHE_SIZE)
 
 # --- CONFIGURACIÓN DE HASHING ---
 # Usamos Argon2 en lugar de bcrypt - mucho más confiable en Windows
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Los parámetros se obtienen con `python calibrate_argon2.py`; sin ellos se usan los de passlib.
+# Al cambiarlos, los hashes antiguos se actualizan en el siguiente login correcto.
+_ARGON2_PARAMS = {
+    name: int(os.environ[env_name])
+    for name, env_name in (
+        ("time_cost", "ARGON2_TIME_COST"),
+        ("memory_cost", "ARGON2_MEMORY_COST"),
+        ("parallelism", "ARGON2_PARALLELISM"),
+    )
+    if os.getenv(env_name)
+}
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    **{f"argon2__{name}": value for name, value in _ARGON2_PARAMS.items()},
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# --- ADMINISTRACIÓN ---
+# Token para los endpoints /admin/*; si no está configurado, quedan deshabilitados
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Crea un token JWT con los datos proporcionados."""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Crea un refresh token JWT con los datos proporcionados."""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+async def verify_password_async(plain_password, hashed_password):
+    """Verifica la contraseña en el pool de hashing sin bloquear el event loop."""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+def password_needs_rehash(hashed_password) -> bool:
+    """Indica si el hash usa parámetros distintos de los configurados (comprobación barata)."""
+    return pwd_context.needs_update(hashed_password)
+
+async def get_password_hash_async(password):
+    """Genera el hash en el pool de hashing sin bloquear el event loop."""
+    return await password_hasher.hash(password)
+
+# Hash de referencia para igualar el tiempo de login de usuarios inexistentes
+_dummy_hash = None
+
+async def prepare_dummy_hash():
+    """Calcula el hash de referencia (al arrancar, para no penalizar el primer login fallido)."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await get_password_hash_async(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+async def verify_dummy_password(password):
+    """Verificación Argon2 contra un hash fijo: mismo coste que un login real, siempre falla."""
+    await verify_password_async(password, await prepare_dummy_hash())
+    return False
+
+def encode_token(claims: dict) -> str:
+    """Firma los claims con la clave activa (asimétrica) o con SECRET_KEY (HS256)."""
+    with JWT_SECONDS.time("encode"):
+        return token_minter.encode(claims)
+
+def create_token_pair(subject: str, generation: int = 0) -> Tuple[str, str]:
+    """
+    Emite el par (access_token, refresh_token) en una sola pasada.
+    El refresh token lleva `jti` (un solo uso) y `gen` (generación de tokens del usuario).
+    """
+    refresh_claims = {"jti": secrets.token_urlsafe(16), "gen": generation}
+    with JWT_SECONDS.time("mint_pair"):
+        return token_minter.mint_pair(
+            subject, ACCESS_TOKEN_EXPIRE_MINUTES * 60, REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+            refresh_claims=refresh_claims,
+        )
+
+def _verify_token(token: str) -> dict:
+    """Verifica firma y expiración sin pasar por la caché."""
+    if signing_keys is not None:
+        from jwt_verifier import InvalidToken  # ya cargado junto al keyring
+        try:
+            return signing_keys.verify(token)
+        except InvalidToken as exc:
+            raise JWTError(str(exc))
+    from jose import jwt  # solo HS256; tras la primera llamada es una búsqueda en sys.modules
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+def warm_up_tokens():
+    """Emite y verifica un par de tokens de prueba para cargar la ruta JWT antes del tráfico."""
+    for token in token_minter.mint_pair("warm-up", 60, 60, refresh_claims={"jti": "warm-up"}):
+        _verify_token(token)
+
+def decode_token(token: str) -> dict:
+    """
+    Decodifica y valida un JWT, reutilizando el resultado si ya está en caché.
+    Lanza JWTError si el token no es válido.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+    with JWT_SECONDS.time("decode"):
+        payload = _verify_token(token)
+    ttl = TOKEN_CACHE_MAX_TTL
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    token_cache.set(key, payload, ttl=ttl)
+    return payload
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """Valida el token JWT y devuelve el nombre de usuario actual."""
@@ -59,7 +171,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         token_type: str = payload.get("type", "access")
         
@@ -73,24 +185,104 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     return username
 
-async def get_current_user_from_refresh_token(token: str = Depends(oauth2_scheme)):
-    """Valida un refresh token y devuelve el nombre de usuario."""
+async def get_access_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """Valida un access token y devuelve sus claims completos (incluido `exp`)."""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        raise credentials_exception
+    if payload.get("type", "access") != "access" or payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+def create_events_ticket(access_claims: dict) -> str:
+    """
+    Emite un ticket corto para abrir /events. EventSource no admite cabeceras y lo que va en
+    la URL acaba en logs de acceso y de proxies: ahí va el ticket, nunca el access token.
+    Conserva el `exp` del access token para los avisos de caducidad del stream.
+    """
+    return encode_token({
+        "sub": access_claims["sub"],
+        "type": "events",
+        "jti": secrets.token_urlsafe(16),
+        "exp": int(time.time()) + EVENTS_TICKET_SECONDS,
+        "token_exp": access_claims.get("exp"),
+    })
+
+async def get_events_ticket_claims(
+    ticket: str = Query(..., description="Ticket de POST /events/ticket (un solo uso)"),
+) -> dict:
+    """
+    Valida y consume un ticket de /events; devuelve `sub` y el `exp` del access token.
+    El consumo se registra en este proceso: con varios workers, la vigencia corta del ticket
+    limita la reutilización.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Ticket de eventos inválido o ya usado",
+    )
+    try:
+        with JWT_SECONDS.time("decode"):
+            payload = _verify_token(ticket)
+    except JWTError:
+        raise credentials_exception
+    jti = payload.get("jti")
+    if payload.get("type") != "events" or payload.get("sub") is None or jti is None:
+        raise credentials_exception
+    if used_events_tickets.get(jti) is not None:
+        raise credentials_exception
+    used_events_tickets.set(jti, True, ttl=max(1.0, payload["exp"] - time.time()))
+    return {"sub": payload["sub"], "exp": payload.get("token_exp")}
+
+class RefreshClaims(NamedTuple):
+    """Datos de un refresh token válido y no revocado en memoria."""
+    username: str
+    jti: str
+    generation: int
+    expires_at: int
+
+
+async def get_refresh_token_claims(token: str = Depends(oauth2_scheme)) -> RefreshClaims:
+    """
+    Valida un refresh token y comprueba su revocación solo en memoria (sin base de datos).
+    La rotación en /refresh confirma contra la tabla durable al consumir el `jti`.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token de refresco inválido",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         token_type: str = payload.get("type", "access")
+        jti: str = payload.get("jti")
         
-        # Verifica que es un refresh token
+        # Verifica que es un refresh token con identificador (los antiguos sin jti no se aceptan)
         if token_type != "refresh":
             raise credentials_exception
         
-        if username is None:
+        if username is None or jti is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    return username
\ No newline at end of file
+    
+    generation = payload.get("gen", 0)
+    result = revocation_store.check(jti, username, generation)
+    REVOCATION_CHECKS.inc(result)
+    if result == REVOKED:
+        raise credentials_exception
+    return RefreshClaims(username, jti, generation, int(payload.get("exp", 0)))
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Exige la cabecera `X-Admin-Token` con el valor de ADMIN_TOKEN."""
+    if not ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acceso de administración denegado",
+        )
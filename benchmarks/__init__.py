@@ -0,0 +1,4 @@
+"""
+Benchmarks de rendimiento. Ejecutar desde la raíz del repositorio, p. ej.:
+    python -m benchmarks.bench_ratelimit
+"""
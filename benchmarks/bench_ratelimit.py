@@ -0,0 +1,128 @@
+"""
+Compara el coste por petición del rate limiting de slowapi frente al middleware nativo.
+
+Cada variante es una app FastAPI mínima con un único endpoint POST /token que se invoca
+directamente por ASGI (sin red ni cliente HTTP), así la diferencia con la app sin límite
+es el coste del rate limiting.
+
+Ejecutar: python -m benchmarks.bench_ratelimit [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from ratelimit import NativeRateLimiter, RateLimitMiddleware
+
+# Límite alto para que ninguna variante rechace durante la medición
+RATE = "100000000/minute"
+
+
+def build_plain_app():
+    app = FastAPI()
+
+    @app.post("/token")
+    async def token(request: Request):
+        return {"ok": True}
+
+    return app
+
+
+def build_slowapi_app():
+    app = FastAPI()
+    limiter = Limiter(key_func=get_remote_address)
+    app.state.limiter = limiter
+
+    @app.post("/token")
+    @limiter.limit(RATE)
+    async def token(request: Request):
+        return {"ok": True}
+
+    return app
+
+
+def build_native_app():
+    app = build_plain_app()
+    app.add_middleware(RateLimitMiddleware, limiter=NativeRateLimiter({("POST", "/token"): RATE}))
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Invoca la app `requests` veces y devuelve los µs medios por petición."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/token",
+        "raw_path": b"/token",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("10.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # Calentamiento (construcción perezosa del stack de middlewares, etc.)
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def bench_engines(requests: int):
+    """Coste aislado de la comprobación del límite (sin FastAPI)."""
+    from limits import parse
+    from limits.storage import MemoryStorage
+    from limits.strategies import FixedWindowRateLimiter
+
+    slowapi_engine = FixedWindowRateLimiter(MemoryStorage())
+    start = time.perf_counter()
+    for _ in range(requests):
+        slowapi_engine.hit(parse(RATE), "10.0.0.1", "/token")
+    limits_us = (time.perf_counter() - start) / requests * 1e6
+
+    native_engine = NativeRateLimiter({("POST", "/token"): RATE})
+    scope = {"method": "POST", "path": "/token", "client": ("10.0.0.1", 50000)}
+    start = time.perf_counter()
+    for _ in range(requests):
+        native_engine.check(scope)
+    native_us = (time.perf_counter() - start) / requests * 1e6
+    return limits_us, native_us
+
+
+async def main(requests: int):
+    plain = await drive(build_plain_app(), requests)
+    slowapi_us = await drive(build_slowapi_app(), requests)
+    native_us = await drive(build_native_app(), requests)
+    limits_us, engine_us = bench_engines(requests)
+
+    print(f"Peticiones por variante: {requests}")
+    print(f"{'variante':<22}{'µs/petición':>14}{'sobrecoste µs':>16}")
+    print(f"{'sin rate limit':<22}{plain:>14.2f}{0:>16.2f}")
+    print(f"{'slowapi':<22}{slowapi_us:>14.2f}{slowapi_us - plain:>16.2f}")
+    print(f"{'nativo (ASGI)':<22}{native_us:>14.2f}{native_us - plain:>16.2f}")
+    print()
+    print("Solo el motor de conteo:")
+    print(f"{'limits (slowapi)':<22}{limits_us:>14.2f}")
+    print(f"{'ventana deslizante':<22}{engine_us:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
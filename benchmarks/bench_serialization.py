@@ -0,0 +1,152 @@
+"""
+Compara el coste por respuesta de la serialización estándar de FastAPI frente a la ruta
+rápida (FAST_JSON): serializadores precompilados que devuelven los bytes directamente.
+
+Se miden dos niveles:
+- Solo serialización: validación con `response_model` + JSON frente a token_json/user_json.
+- Por petición: app FastAPI mínima invocada directamente por ASGI con cada variante.
+
+Ejecutar: python -m benchmarks.bench_serialization [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import schemas
+from serialization import FastJSONResponse, token_json, token_response, user_json, user_response
+
+
+class _Row:
+    """Sustituto de una fila ORM de User (mismos atributos)."""
+
+    def __init__(self):
+        self.id = 42
+        self.username = "benchmark_user"
+        self.created_at = datetime(2024, 1, 1, 12, 30, 15, 123456)
+        self.hashed_password = "$argon2id$..."
+
+
+TOKEN = {
+    "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "a" * 120 + ".sig" + "b" * 40,
+    "refresh_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "c" * 140 + ".sig" + "d" * 40,
+    "token_type": "bearer",
+    "expires_in": 1800,
+}
+ROW = _Row()
+
+
+def per_call_us(func, iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def standard_token():
+    # Lo que hace FastAPI con un dict y response_model: validar, volcar y codificar
+    content = schemas.Token.model_validate(TOKEN).model_dump(mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def standard_user():
+    content = schemas.UserInDB.model_validate(ROW).model_dump(mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_token():
+    return token_json(TOKEN["access_token"], TOKEN["refresh_token"], TOKEN["expires_in"])
+
+
+def fast_user():
+    return user_json(ROW)
+
+
+def build_standard_app():
+    app = FastAPI()
+
+    @app.get("/token", response_model=schemas.Token)
+    async def token():
+        return dict(TOKEN)
+
+    @app.get("/users/me", response_model=schemas.UserInDB)
+    async def me():
+        return ROW
+
+    return app
+
+
+def build_fast_app():
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/token", response_model=schemas.Token)
+    async def token():
+        return token_response(TOKEN["access_token"], TOKEN["refresh_token"], TOKEN["expires_in"])
+
+    @app.get("/users/me", response_model=schemas.UserInDB)
+    async def me():
+        return user_response(ROW)
+
+    return app
+
+
+async def drive(app, path: str, requests: int) -> float:
+    """Invoca la app `requests` veces y devuelve los µs medios por petición."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("10.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int):
+    print(f"Iteraciones por variante: {requests}")
+    print(f"{'serialización':<22}{'estándar µs':>14}{'rápida µs':>12}{'ahorro µs':>12}")
+    for name, standard, fast in (("Token", standard_token, fast_token), ("UserInDB", standard_user, fast_user)):
+        standard_us = per_call_us(standard, requests)
+        fast_us = per_call_us(fast, requests)
+        print(f"{name:<22}{standard_us:>14.2f}{fast_us:>12.2f}{standard_us - fast_us:>12.2f}")
+
+    print()
+    print(f"{'petición ASGI':<22}{'estándar µs':>14}{'rápida µs':>12}{'ahorro µs':>12}")
+    standard_app, fast_app = build_standard_app(), build_fast_app()
+    for path in ("/token", "/users/me"):
+        standard_us = await drive(standard_app, path, requests)
+        fast_us = await drive(fast_app, path, requests)
+        print(f"{path:<22}{standard_us:>14.2f}{fast_us:>12.2f}{standard_us - fast_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
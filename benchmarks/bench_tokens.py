@@ -0,0 +1,64 @@
+"""
+Compara la emisión del par access/refresh con python-jose (ruta anterior: dos
+create_*_token con datetime y jwt.encode) frente a TokenMinter.mint_pair.
+
+También comprueba que los tokens del minter se verifican con jose.jwt.decode.
+
+Ejecutar: python -m benchmarks.bench_tokens [--iterations 20000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from jose import jwt
+
+from token_minter import TokenMinter
+
+SECRET_KEY = "benchmark-secret-key-with-enough-length-123"
+ALGORITHM = "HS256"
+ACCESS_TTL = 30 * 60
+REFRESH_TTL = 7 * 86400
+
+
+def jose_pair(subject: str):
+    """Réplica de la ruta original de /token: dos tokens independientes."""
+    access = {"sub": subject}.copy()
+    access.update({"exp": datetime.now(timezone.utc) + timedelta(seconds=ACCESS_TTL)})
+    access_token = jwt.encode(access, SECRET_KEY, algorithm=ALGORITHM)
+    refresh = {"sub": subject}.copy()
+    refresh.update({"exp": datetime.now(timezone.utc) + timedelta(seconds=REFRESH_TTL), "type": "refresh"})
+    refresh_token = jwt.encode(refresh, SECRET_KEY, algorithm=ALGORITHM)
+    return access_token, refresh_token
+
+
+def per_call_us(func, iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations: int):
+    minter = TokenMinter(SECRET_KEY, ALGORITHM)
+
+    access_token, refresh_token = minter.mint_pair("benchmark_user", ACCESS_TTL, REFRESH_TTL)
+    assert jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])["sub"] == "benchmark_user"
+    assert jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])["type"] == "refresh"
+
+    jose_us = per_call_us(lambda: jose_pair("benchmark_user"), iterations)
+    minter_us = per_call_us(lambda: minter.mint_pair("benchmark_user", ACCESS_TTL, REFRESH_TTL), iterations)
+
+    print(f"Pares emitidos por variante: {iterations}")
+    print(f"{'variante':<22}{'µs/par':>10}{'pares/s':>12}")
+    print(f"{'python-jose':<22}{jose_us:>10.2f}{1e6 / jose_us:>12.0f}")
+    print(f"{'TokenMinter':<22}{minter_us:>10.2f}{1e6 / minter_us:>12.0f}")
+    print(f"Aceleración: x{jose_us / minter_us:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,53 @@
+"""
+Filtro de Bloom en memoria: pertenencia aproximada sin falsos negativos.
+
+Si `item in filtro` es False, el elemento seguro que no se añadió; si es True, puede ser un
+falso positivo (con probabilidad ~error_rate a plena capacidad) y hay que confirmarlo en
+otra capa. No admite borrado: para olvidar elementos se reconstruye.
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Bitset en un bytearray con k posiciones por elemento (doble hashing sobre blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity > 0 y 0 < error_rate < 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Tamaño y número de hashes óptimos para la capacidad y el error objetivo
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str):
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+    @property
+    def saturated(self) -> bool:
+        """Se han añadido más elementos de los previstos: el error real supera el objetivo."""
+        return self.count > self.capacity
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Calibra los parámetros de Argon2 para este host.
+
+Mide el tiempo de verificación para distintas combinaciones de memoria y número de
+pasadas y elige la más costosa (memoria x pasadas) cuya mediana no supera el objetivo.
+Imprime las variables ARGON2_* para copiar al .env.
+
+Ejecutar: python calibrate_argon2.py --target-ms 250 --max-memory-mib 128
+
+Notas:
+- El paralelismo por defecto es 1: el pool de hashing ya reparte los logins entre
+  núcleos, y varios carriles por hash solo compiten con las demás peticiones.
+- Tras cambiar los parámetros, los hashes existentes se actualizan solos en el
+  siguiente login correcto de cada usuario.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from passlib.hash import argon2
+
+# Memoria en KiB (19 MiB es el mínimo recomendado por OWASP para argon2id)
+MEMORY_STEPS_KIB = (19456, 32768, 47104, 65536, 98304, 131072, 196608, 262144)
+MAX_TIME_COST = 10
+PASSWORD = "calibration-password-123"
+
+
+def measure_verify_ms(time_cost: int, memory_cost: int, parallelism: int, rounds: int) -> float:
+    """Mediana en ms de verificar un hash con los parámetros dados."""
+    hasher = argon2.using(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    hashed = hasher.hash(PASSWORD)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.verify(PASSWORD, hashed)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def calibrate(target_ms: float, max_memory_kib: int, parallelism: int, rounds: int, verbose: bool = True):
+    """Devuelve (time_cost, memory_cost, parallelism, ms) o None si nada cumple el objetivo."""
+    best = None
+    for memory_cost in (m for m in MEMORY_STEPS_KIB if m <= max_memory_kib):
+        for time_cost in range(1, MAX_TIME_COST + 1):
+            elapsed = measure_verify_ms(time_cost, memory_cost, parallelism, rounds)
+            if verbose:
+                print(f"  m={memory_cost // 1024:>4} MiB  t={time_cost:<2} p={parallelism}  {elapsed:8.1f} ms")
+            if elapsed > target_ms:
+                break
+            if best is None or memory_cost * time_cost > best[1] * best[0]:
+                best = (time_cost, memory_cost, parallelism, elapsed)
+        else:
+            continue
+        if time_cost == 1:
+            # Ni una pasada cabe en el objetivo con esta memoria: más memoria tampoco cabrá
+            break
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250, help="Latencia objetivo de verificación")
+    parser.add_argument("--max-memory-mib", type=int, default=128, help="Memoria máxima por hash")
+    parser.add_argument("--parallelism", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=5, help="Mediciones por combinación")
+    args = parser.parse_args()
+
+    print(f"Calibrando Argon2 (objetivo {args.target_ms:.0f} ms, máx. {args.max_memory_mib} MiB)...")
+    best = calibrate(args.target_ms, args.max_memory_mib * 1024, args.parallelism, args.rounds)
+    if best is None:
+        print("Ninguna combinación cumple el objetivo; sube --target-ms o baja la memoria mínima.", file=sys.stderr)
+        return 1
+
+    time_cost, memory_cost, parallelism, elapsed = best
+    print(f"\nElegido: m={memory_cost // 1024} MiB, t={time_cost}, p={parallelism} ({elapsed:.1f} ms)\n")
+    print("# Añadir al .env:")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_cost}")
+    print(f"ARGON2_PARALLELISM={parallelism}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
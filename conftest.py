@@ -61,15 +61,22 @@ def override_get_db_fixture(db_session):
 @pytest.fixture(autouse=True)
 def disable_rate_limiting():
     """Desactiva el rate limiting durante los tests."""
-    from main import limiter
+    from main import limiter, native_limiter
+    from login_throttle import login_throttle
     
     # Guardamos el estado original
     original_enabled = limiter.enabled
+    original_native_enabled = native_limiter.enabled
+    original_throttle_enabled = login_throttle.enabled
     
     # Desactivamos el rate limiting
     limiter.enabled = False
+    native_limiter.enabled = False
+    login_throttle.enabled = False
     
     yield
     
     # Restauramos el estado original
     limiter.enabled = original_enabled
+    native_limiter.enabled = original_native_enabled
+    login_throttle.enabled = original_throttle_enabled
@@ -1,22 +1,268 @@
-# crud.py
 """
 Operaciones CRUD (Create, Read, Update, Delete) para usuarios.
 """
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import delete, insert, literal, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 import models, schemas
-from auth import get_password_hash
+from auth import get_password_hash_async
+from database import use_primary
+from hashing import password_hasher
+from metrics import DB_QUERY_SECONDS
+from user_cache import profile_cache
+from username_index import username_index
+
+class CreateUserResult(NamedTuple):
+    """Resultado de create_user: la fila creada (id, username, created_at) o None si ya existía."""
+    user: Optional[Any]
+
+    @property
+    def created(self) -> bool:
+        return self.user is not None
+
+
+# INSERT ... ON CONFLICT DO NOTHING por dialecto; en otros se recurre a capturar IntegrityError
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _insert_user_ignoring_duplicates(db: AsyncSession):
+    """INSERT de usuarios que ignora nombres ya existentes, o None si el dialecto no lo soporta."""
+    dialect_insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        return None
+    return dialect_insert(models.User).on_conflict_do_nothing(index_elements=[models.User.username])
+
 
 async def get_user_by_username(db: AsyncSession, username: str):
     """Obtiene un usuario por su nombre de usuario."""
-    result = await db.execute(select(models.User).filter(models.User.username == username))
-    return result.scalars().first()
-
-async def create_user(db: AsyncSession, user: schemas.UserCreate):
-    """Crea un nuevo usuario en la base de datos."""
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(username=user.username, hashed_password=hashed_password)
-    db.add(db_user)
-    await db.commit()
-    await db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    with DB_QUERY_SECONDS.time("get_user_by_username"):
+        result = await db.execute(select(models.User).filter(models.User.username == username))
+        return result.scalars().first()
+
+async def get_user_profile(db: AsyncSession, username: str):
+    """Obtiene el perfil público de un usuario, pasando primero por la caché de perfiles."""
+    profile = await profile_cache.get(username)
+    if profile is not None:
+        return profile
+    db_user = await get_user_by_username(db, username=username)
+    if db_user is None:
+        return None
+    profile = schemas.UserInDB.model_validate(db_user)
+    await profile_cache.set(username, profile)
+    return profile
+
+async def invalidate_user_profile(username: str):
+    """Descarta el perfil cacheado; llamar tras cualquier escritura sobre el usuario."""
+    await profile_cache.delete(username)
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> CreateUserResult:
+    """
+    Crea un nuevo usuario con una sola sentencia atómica:
+    INSERT ... ON CONFLICT (username) DO NOTHING RETURNING id, username, created_at.
+    Un nombre ya existente (incluso por una carrera) devuelve CreateUserResult(None).
+    """
+    hashed_password = await get_password_hash_async(user.password)
+    values = {"username": user.username, "hashed_password": hashed_password}
+    returning = (models.User.id, models.User.username, models.User.created_at)
+    statement = _insert_user_ignoring_duplicates(db)
+    # Un INSERT de Core no pasa por el flush: fijar el primario para leer lo escrito
+    use_primary(db)
+    with DB_QUERY_SECONDS.time("create_user"):
+        if statement is not None:
+            result = await db.execute(statement.values(**values).returning(*returning))
+            row = result.first()
+            await db.commit()
+        else:
+            try:
+                result = await db.execute(insert(models.User).values(**values).returning(*returning))
+                row = result.first()
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                row = None
+    if row is None:
+        username_index.add(user.username)
+        return CreateUserResult(None)
+    username_index.add(row.username, row.id)
+    await invalidate_user_profile(user.username)
+    return CreateUserResult(row)
+
+
+async def update_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """
+    Sustituye el hash de la contraseña solo si no cambió desde que se leyó.
+    Devuelve True si se actualizó.
+    """
+    with DB_QUERY_SECONDS.time("update_password_hash"):
+        result = await db.execute(
+            update(models.User)
+            .where(models.User.id == user_id, models.User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
+    return result.rowcount == 1
+
+
+async def _insert_users_one_by_one(db: AsyncSession, values: list, returning) -> dict:
+    """INSERT por fila para dialectos sin ON CONFLICT; las filas que chocan se omiten."""
+    created = {}
+    for row_values in values:
+        try:
+            result = await db.execute(insert(models.User).values(**row_values).returning(*returning))
+            row = result.first()
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            continue
+        created[row.username] = row
+    return created
+
+
+async def create_users_batch(db: AsyncSession, users: list):
+    """
+    Crea varios usuarios con una sola consulta de duplicados y un único INSERT multi-fila.
+    Devuelve un resultado por usuario, en el mismo orden de entrada.
+    """
+    usernames = [user.username for user in users]
+    with DB_QUERY_SECONDS.time("find_existing_usernames"):
+        result = await db.execute(
+            select(models.User.username).filter(models.User.username.in_(set(usernames)))
+        )
+        taken = set(result.scalars().all())
+
+    # Los repetidos dentro del propio lote cuentan como duplicados tras el primero
+    to_create = []
+    for user in users:
+        if user.username not in taken:
+            taken.add(user.username)
+            to_create.append(user)
+
+    created = {}
+    if to_create:
+        hashes = await password_hasher.hash_many([user.password for user in to_create])
+        values = [
+            {"username": user.username, "hashed_password": hashed}
+            for user, hashed in zip(to_create, hashes)
+        ]
+        returning = (models.User.id, models.User.username, models.User.created_at)
+        # Con ON CONFLICT, un alta concurrente fuera del lote se reporta como duplicado
+        statement = _insert_user_ignoring_duplicates(db)
+        use_primary(db)
+        with DB_QUERY_SECONDS.time("create_users_batch"):
+            if statement is not None:
+                rows = await db.execute(statement.returning(*returning), values)
+                created = {row.username: row for row in rows.all()}
+                await db.commit()
+            else:
+                try:
+                    rows = await db.execute(insert(models.User).returning(*returning), values)
+                    created = {row.username: row for row in rows.all()}
+                    await db.commit()
+                except IntegrityError:
+                    # Un alta concurrente chocó con el lote: se repite fila a fila para
+                    # crear el resto y reportar solo los choques como duplicados
+                    await db.rollback()
+                    created = await _insert_users_one_by_one(db, values, returning)
+        for username, row in created.items():
+            username_index.add(username, row.id)
+            await invalidate_user_profile(username)
+
+    results = []
+    pending = dict(created)
+    for username in usernames:
+        row = pending.pop(username, None)
+        if row is None:
+            results.append(schemas.UserBatchItemResult(username=username, status="duplicate"))
+        else:
+            results.append(schemas.UserBatchItemResult(
+                username=username, status="created", id=row.id, created_at=row.created_at
+            ))
+    return schemas.UserBatchResult(
+        created=len(created), duplicates=len(usernames) - len(created), results=results
+    )
+
+
+async def consume_refresh_token(db: AsyncSession, jti: str, username: str, generation: int, expires_at: int) -> bool:
+    """
+    Marca un refresh token como usado (rotación de un solo uso) en una sola sentencia.
+    Devuelve False si ya estaba consumido/revocado o si su generación ya no es la vigente.
+    """
+    statement = insert(models.RevokedToken).from_select(
+        ["jti", "username", "expires_at"],
+        select(literal(jti), literal(username), literal(expires_at))
+        .select_from(models.User)
+        .where(models.User.username == username, models.User.token_generation == generation),
+    )
+    with DB_QUERY_SECONDS.time("consume_refresh_token"):
+        try:
+            result = await db.execute(statement)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return False
+    return result.rowcount == 1
+
+
+async def revoke_all_refresh_tokens(db: AsyncSession, username: str, expires_at: int):
+    """
+    Sube la generación de tokens del usuario y registra la revocación para los demás workers.
+    Devuelve la nueva generación, o None si el usuario no existe.
+    """
+    with DB_QUERY_SECONDS.time("revoke_all_refresh_tokens"):
+        result = await db.execute(
+            update(models.User)
+            .where(models.User.username == username)
+            .values(token_generation=models.User.token_generation + 1)
+            .returning(models.User.token_generation)
+        )
+        generation = result.scalar_one_or_none()
+        if generation is None:
+            await db.rollback()
+            return None
+        db.add(models.RevokedToken(
+            jti=f"gen:{username}:{generation}", username=username,
+            generation=generation, expires_at=expires_at,
+        ))
+        await db.commit()
+    return generation
+
+
+async def get_revocations(db: AsyncSession, after_id: int, now: int):
+    """Filas de revocación vigentes posteriores a `after_id`, en orden de inserción."""
+    with DB_QUERY_SECONDS.time("get_revocations"):
+        result = await db.execute(
+            select(models.RevokedToken)
+            .where(models.RevokedToken.id > after_id, models.RevokedToken.expires_at > now)
+            .order_by(models.RevokedToken.id)
+        )
+        return result.scalars().all()
+
+
+async def delete_expired_revocations(db: AsyncSession, now: int) -> int:
+    """Borra las revocaciones de tokens ya expirados (no hace falta recordarlas)."""
+    with DB_QUERY_SECONDS.time("delete_expired_revocations"):
+        result = await db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= now))
+        await db.commit()
+    return result.rowcount
+
+
+async def stream_usernames(db: AsyncSession, batch_size: int = 10_000):
+    """Recorre todos los (id, username) en bloques, sin cargar la tabla entera en memoria."""
+    result = await db.stream(
+        select(models.User.id, models.User.username).execution_options(yield_per=batch_size)
+    )
+    async for row in result:
+        yield row.id, row.username
+
+
+async def get_usernames_after(db: AsyncSession, after_id: int):
+    """(id, username) de los usuarios con id mayor que `after_id`."""
+    with DB_QUERY_SECONDS.time("get_usernames_after"):
+        result = await db.execute(
+            select(models.User.id, models.User.username).where(models.User.id > after_id)
+        )
+        return [(row.id, row.username) for row in result.all()]
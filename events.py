@@ -0,0 +1,191 @@
+"""
+Canal de eventos del servidor al navegador (Server-Sent Events) para sustituir el polling.
+
+Eventos:
+- `health`: estado de la API; se envía al conectar y solo cuando cambia.
+- `token_expiring` / `token_expired`: avisos derivados del `exp` del access token con el
+  que se abrió el canal. Tras `token_expired` el servidor cierra el stream; el cliente
+  renueva el token y vuelve a conectar.
+- Comentarios `: ping` cada SSE_HEARTBEAT_SECONDS para que proxies y balanceadores no
+  corten las conexiones inactivas.
+
+Coste por conexión inactiva: una cola pequeña, la corrutina que la espera, una tarea
+pendiente de `receive` (para detectar la desconexión) y dos timers del loop para los
+avisos del token. Los eventos se codifican una sola vez y se comparten los mismos bytes
+entre todas las conexiones. El latido es una única tarea para todo el proceso.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Optional, Set
+
+from starlette.responses import Response
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DEL CANAL DE EVENTOS ---
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "25"))
+# Espera que el navegador aplica antes de reconectar tras un corte (campo `retry`)
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "5000"))
+SSE_TOKEN_WARNING_SECONDS = float(os.getenv("SSE_TOKEN_WARNING_SECONDS", "60"))
+# Conexiones simultáneas por worker; por encima se responde 503
+SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", "20000"))
+# Eventos pendientes por conexión; un cliente que no los consume se desconecta
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "16"))
+
+PING = b": ping\n\n"
+_CLOSE = None  # fin del stream
+
+
+class EventStreamFull(Exception):
+    """Se lanza al suscribirse con SSE_MAX_CONNECTIONS conexiones abiertas."""
+
+
+def format_event(event: str, data) -> bytes:
+    """Codifica un evento SSE con datos JSON (una sola línea `data:`)."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class EventBroadcaster:
+    """Difunde eventos a todas las conexiones SSE abiertas en este proceso."""
+
+    def __init__(self, max_connections: int = SSE_MAX_CONNECTIONS, heartbeat: float = SSE_HEARTBEAT_SECONDS):
+        self.max_connections = max_connections
+        self.heartbeat = heartbeat
+        self.health = {"status": "ok"}
+        self._health_event = format_event("health", self.health)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.dropped = 0
+
+    @property
+    def connections(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        if self.closed or len(self._subscribers) >= self.max_connections:
+            raise EventStreamFull("Demasiadas conexiones de eventos abiertas")
+        queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def deliver(self, queue: asyncio.Queue, message: Optional[bytes]):
+        """Entrega un mensaje a una conexión; si su cola está llena, la cierra."""
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.end(queue)
+
+    def end(self, queue: asyncio.Queue):
+        """Termina el stream de una conexión descartando lo que tuviera pendiente."""
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CLOSE)
+
+    def publish(self, message: bytes):
+        for queue in list(self._subscribers):
+            self.deliver(queue, message)
+
+    def set_health(self, health: dict) -> bool:
+        """Publica el estado de salud si cambió. Devuelve True si se publicó."""
+        if health == self.health:
+            return False
+        self.health = health
+        self._health_event = format_event("health", health)
+        self.publish(self._health_event)
+        return True
+
+    def initial_message(self) -> bytes:
+        return f"retry: {SSE_RETRY_MS}\n\n".encode() + self._health_event
+
+    def start(self):
+        self.closed = False
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self.publish(PING)
+
+    def close(self):
+        """Cierra todos los streams (al apagar, para no retener el cierre ordenado)."""
+        self.closed = True
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for queue in list(self._subscribers):
+            self.end(queue)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class EventStream(Response):
+    """
+    Respuesta ASGI text/event-stream sobre una suscripción ya creada.
+    No usa StreamingResponse para no añadir un grupo de tareas por conexión.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, broadcaster: EventBroadcaster, queue: asyncio.Queue, expires_at: Optional[float] = None,
+                 warning_seconds: float = SSE_TOKEN_WARNING_SECONDS):
+        self.status_code = 200
+        self.background = None
+        self.broadcaster = broadcaster
+        self.queue = queue
+        self.expires_at = expires_at
+        self.warning_seconds = warning_seconds
+        self.init_headers({
+            "Content-Type": "text/event-stream; charset=utf-8",
+            "Cache-Control": "no-cache",
+            # nginx: sin buffering para que cada evento llegue al momento
+            "X-Accel-Buffering": "no",
+        })
+
+    def _token_expiring(self):
+        expires_in = max(0, round(self.expires_at - time.time()))
+        self.broadcaster.deliver(self.queue, format_event("token_expiring", {"expires_in": expires_in}))
+
+    def _token_expired(self):
+        self.broadcaster.deliver(self.queue, format_event("token_expired", {}))
+        self.broadcaster.deliver(self.queue, _CLOSE)
+
+    async def __call__(self, scope, receive, send):
+        queue, broadcaster = self.queue, self.broadcaster
+        loop = asyncio.get_running_loop()
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        disconnect.add_done_callback(lambda _: broadcaster.end(queue))
+        timers = []
+        if self.expires_at is not None:
+            remaining = self.expires_at - time.time()
+            timers.append(loop.call_later(max(0.0, remaining - self.warning_seconds), self._token_expiring))
+            timers.append(loop.call_later(max(0.0, remaining), self._token_expired))
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            message = broadcaster.initial_message()
+            while message is not _CLOSE:
+                await send({"type": "http.response.body", "body": message, "more_body": True})
+                message = await queue.get()
+            if not disconnect.done():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            for timer in timers:
+                timer.cancel()
+            disconnect.cancel()
+            broadcaster.unsubscribe(queue)
+
+
+event_broadcaster = EventBroadcaster()
@@ -16,6 +16,18 @@ let authState = {
     tokenExpiry: null
 };
 
+// Canal de eventos del servidor (sustituye al polling de /health mientras está abierto)
+let eventSource = null;
+let reconnectTimer = null;
+let reconnectDelay = 1000;
+let eventsAttempt = 0;
+const RECONNECT_MAX_DELAY = 60000;
+let tokenWarning = null;
+let countdownTimer = null;
+// Sin canal de eventos (sesión cerrada, token caducado o reconectando) se sondea /health
+const HEALTH_POLL_INTERVAL = 30000;
+let healthPollTimer = null;
+
 // ============================================
 // INICIALIZACIÓN
 // ============================================
@@ -25,6 +37,7 @@ document.addEventListener('DOMContentLoaded', () => {
     checkAPIHealth();
     restoreAuthState();
     updateUI();
+    connectEvents();
 });
 
 function initializeEventListeners() {
@@ -139,12 +152,14 @@ async function handleLogin(e) {
             authState.refreshToken = data.refresh_token;
             authState.isAuthenticated = true;
             authState.tokenExpiry = new Date(Date.now() + (data.expires_in * 1000));
+            tokenWarning = null;
 
             // Guardar en localStorage
             saveAuthState();
 
             // Obtener información del usuario
             await fetchCurrentUser();
+            connectEvents();
 
             showMessage(messageDiv, '✓ Sesión iniciada correctamente', 'success');
             document.getElementById('login-form').reset();
@@ -175,6 +190,7 @@ function handleLogout() {
             tokenExpiry: null
         };
         localStorage.removeItem('authState');
+        disconnectEvents();
         updateUI();
         switchTab('login');
         showMessage(
@@ -257,9 +273,12 @@ async function handleRefreshToken() {
             authState.accessToken = data.access_token;
             authState.refreshToken = data.refresh_token;
             authState.tokenExpiry = new Date(Date.now() + (data.expires_in * 1000));
+            tokenWarning = null;
 
             saveAuthState();
             updateTokenDisplay();
+            // El stream se abrió con el token anterior: reconectar con el nuevo
+            connectEvents();
 
             resultDiv.textContent = JSON.stringify({
                 message: '✓ Token renovado exitosamente',
@@ -322,26 +341,128 @@ async function testEndpoint(endpoint) {
 // API - VERIFICAR SALUD
 // ============================================
 
+// Consulta puntual al cargar y sondeo periódico mientras no hay canal de eventos; con
+// /events abierto los cambios llegan por el stream sin polling
 async function checkAPIHealth() {
-    const healthIndicator = document.getElementById('api-health');
-
     try {
         const response = await fetch(`${API_URL}/health`);
-        
-        if (response.ok) {
-            healthIndicator.textContent = '🟢 En línea';
-            healthIndicator.className = 'health-indicator online';
-        } else {
-            healthIndicator.textContent = '🔴 Offline';
-            healthIndicator.className = 'health-indicator offline';
-        }
+        setHealthIndicator(response.ok ? 'ok' : 'unavailable');
     } catch (error) {
+        setHealthIndicator('unavailable');
+    }
+}
+
+function setHealthIndicator(status) {
+    const healthIndicator = document.getElementById('api-health');
+
+    if (status === 'ok') {
+        healthIndicator.textContent = '🟢 En línea';
+        healthIndicator.className = 'health-indicator online';
+    } else if (status === 'degraded') {
+        healthIndicator.textContent = '🟠 Degradada';
+        healthIndicator.className = 'health-indicator offline';
+    } else {
         healthIndicator.textContent = '🔴 Offline';
         healthIndicator.className = 'health-indicator offline';
     }
+}
+
+// ============================================
+// EVENTOS DEL SERVIDOR (SSE)
+// ============================================
+
+async function connectEvents() {
+    disconnectEvents();
+    if (!authState.isAuthenticated || !authState.accessToken) {
+        return;
+    }
+    if (authState.tokenExpiry && authState.tokenExpiry <= new Date()) {
+        return;
+    }
+
+    // EventSource no permite cabeceras: el access token se cambia por un ticket de un
+    // solo uso y es el ticket lo que va en la URL
+    const attempt = eventsAttempt;
+    let ticket;
+    try {
+        const response = await fetch(`${API_URL}/events/ticket`, {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${authState.accessToken}` },
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        ticket = (await response.json()).ticket;
+    } catch (error) {
+        if (attempt === eventsAttempt) {
+            checkAPIHealth();
+            scheduleReconnect();
+        }
+        return;
+    }
+    if (attempt !== eventsAttempt) {
+        return;  // logout o nueva conexión mientras se pedía el ticket
+    }
+
+    eventSource = new EventSource(`${API_URL}/events?ticket=${encodeURIComponent(ticket)}`);
 
-    // Verificar cada 30 segundos
-    setInterval(checkAPIHealth, 30000);
+    eventSource.addEventListener('open', () => {
+        reconnectDelay = 1000;
+        stopHealthPolling();
+    });
+
+    eventSource.addEventListener('health', (e) => {
+        setHealthIndicator(JSON.parse(e.data).status);
+    });
+
+    eventSource.addEventListener('token_expiring', (e) => {
+        const { expires_in } = JSON.parse(e.data);
+        tokenWarning = `⚠️ El token caduca en ${expires_in}s: renuévalo`;
+        updateTokenDisplay();
+    });
+
+    eventSource.addEventListener('token_expired', () => {
+        // El servidor cierra el stream; se reabre al renovar el token
+        disconnectEvents();
+        tokenWarning = '⚠️ Token caducado: usa "Renovar token"';
+        updateTokenDisplay();
+    });
+
+    eventSource.addEventListener('error', () => {
+        // Se gestiona aquí la reconexión (con backoff) en lugar de la automática del navegador
+        disconnectEvents();
+        checkAPIHealth();
+        scheduleReconnect();
+    });
+}
+
+function disconnectEvents() {
+    eventsAttempt++;
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+    clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+    startHealthPolling();
+}
+
+function startHealthPolling() {
+    if (!healthPollTimer) {
+        healthPollTimer = setInterval(checkAPIHealth, HEALTH_POLL_INTERVAL);
+    }
+}
+
+function stopHealthPolling() {
+    clearInterval(healthPollTimer);
+    healthPollTimer = null;
+}
+
+function scheduleReconnect() {
+    // Backoff exponencial con jitter para que miles de pestañas no reconecten a la vez
+    const delay = reconnectDelay / 2 + Math.random() * reconnectDelay / 2;
+    reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_DELAY);
+    reconnectTimer = setTimeout(connectEvents, delay);
 }
 
 // ============================================
@@ -368,7 +489,9 @@ function updateUI() {
         userStatus.style.color = '#10b981';
 
         updateTokenDisplay();
+        startTokenCountdown();
     } else {
+        stopTokenCountdown();
         // Mostrar formularios
         authSection.style.display = 'block';
         dashboardSection.style.display = 'none';
@@ -392,11 +515,28 @@ function updateTokenDisplay() {
         const minutesLeft = Math.floor(timeLeft / 60000);
         const secondsLeft = Math.floor((timeLeft % 60000) / 1000);
 
-        document.getElementById('token-expiry').textContent = 
-            `${minutesLeft}m ${secondsLeft}s (${authState.tokenExpiry.toLocaleTimeString()})`;
+        let text = timeLeft > 0
+            ? `${minutesLeft}m ${secondsLeft}s (${authState.tokenExpiry.toLocaleTimeString()})`
+            : `caducado (${authState.tokenExpiry.toLocaleTimeString()})`;
+        if (tokenWarning) {
+            text += ` ${tokenWarning}`;
+        }
+        document.getElementById('token-expiry').textContent = text;
+    }
+}
+
+// Cuenta atrás local (sin peticiones), solo mientras se muestra el panel
+function startTokenCountdown() {
+    if (!countdownTimer) {
+        countdownTimer = setInterval(updateTokenDisplay, 1000);
     }
 }
 
+function stopTokenCountdown() {
+    clearInterval(countdownTimer);
+    countdownTimer = null;
+}
+
 // ============================================
 // TABS - CAMBIAR PESTAÑA
 // ============================================
@@ -477,14 +617,3 @@ function restoreAuthState() {
         }
     }
 }
-
-// ============================================
-// UTILIDADES
-// ============================================
-
-// Actualizar contador de tokens cada segundo
-setInterval(() => {
-    if (authState.isAuthenticated) {
-        updateTokenDisplay();
-    }
-}, 1000);
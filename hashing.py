@@ -0,0 +1,141 @@
+"""
+Servicio de hashing asíncrono para contraseñas.
+Ejecuta Argon2 en un pool de workers (hilos o procesos) para no bloquear el event loop.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from metrics import HASH_SECONDS
+
+# --- CONFIGURACIÓN DEL POOL DE HASHING ---
+# "thread" usa hilos (argon2-cffi libera el GIL), "process" usa procesos separados.
+HASHING_POOL_KIND = os.getenv("HASHING_POOL_KIND", "thread")
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", str(os.cpu_count() or 1)))
+# Máximo de operaciones pendientes (en ejecución + en cola) antes de rechazar nuevas
+HASHING_MAX_QUEUE = int(os.getenv("HASHING_MAX_QUEUE", "256"))
+# Segundos que una petición puede esperar un hueco en la cola antes de fallar
+HASHING_QUEUE_TIMEOUT = float(os.getenv("HASHING_QUEUE_TIMEOUT", "5"))
+
+
+class HashingQueueFull(Exception):
+    """Se lanza cuando la cola de hashing está llena y no se liberó a tiempo."""
+
+
+def _hash(password: str) -> str:
+    # Importación diferida: en modo "process" se ejecuta dentro del worker
+    from auth import pwd_context
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    from auth import pwd_context
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _load_backend() -> int:
+    # Carga el backend Argon2 en el worker sin calcular ningún hash
+    from auth import pwd_context
+    pwd_context.handler().get_backend()
+    return os.getpid()
+
+
+def _timed(func, *args):
+    # Se mide dentro del worker para excluir la espera en cola
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """Pool acotado de workers para hashear y verificar contraseñas."""
+
+    def __init__(
+        self,
+        kind: str = HASHING_POOL_KIND,
+        workers: int = HASHING_WORKERS,
+        max_queue: int = HASHING_MAX_QUEUE,
+        queue_timeout: float = HASHING_QUEUE_TIMEOUT,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"HASHING_POOL_KIND inválido: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(self.workers, max_queue)
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pending = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="hashing"
+                )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # El semáforo queda ligado al loop en uso; se recrea si el loop cambia
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_queue)
+            self._loop = loop
+        return self._semaphore
+
+    async def _submit(self, operation: str, func, *args):
+        semaphore = self._get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HashingQueueFull("La cola de hashing está llena")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(self._get_executor(), _timed, func, *args)
+            HASH_SECONDS.observe(elapsed, operation)
+            return result
+        finally:
+            self.pending -= 1
+            semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """Genera el hash Argon2 de una contraseña sin bloquear el event loop."""
+        return await self._submit("hash", _hash, password)
+
+    async def hash_many(self, passwords: list) -> list:
+        """
+        Hashea varias contraseñas en paralelo, con como máximo `workers` en vuelo
+        para no acaparar la cola compartida con el resto de peticiones.
+        """
+        window = asyncio.Semaphore(self.workers)
+
+        async def hash_one(password):
+            async with window:
+                return await self.hash(password)
+
+        return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica una contraseña contra su hash sin bloquear el event loop."""
+        return await self._submit("verify", _verify, plain_password, hashed_password)
+
+    async def warm_up(self):
+        """Arranca todos los workers del pool y carga en ellos el backend de Argon2."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, _load_backend) for _ in range(self.workers)))
+
+    def shutdown(self, wait: bool = True):
+        """Libera los workers del pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
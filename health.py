@@ -0,0 +1,209 @@
+"""
+Comprobaciones de salud por niveles.
+
+- /health/live: el proceso responde. Cuerpo y cabeceras precalculados, sin log ni E/S.
+- /health/ready: si el worker puede atender tráfico. Devuelve el último informe del
+  prober en segundo plano (cada HEALTH_PROBE_INTERVAL segundos): base de datos, saturación
+  del pool de conexiones y del pool de hashing, y retardo del event loop. Ninguna petición
+  de readiness ejecuta comprobaciones, así que sondearlo con frecuencia no cuesta nada.
+
+Ambos se sirven desde HealthProbeMiddleware, el middleware más externo: no pasan por
+métricas, CORS ni rate limiting. Los cambios de estado global se publican también en el
+canal SSE (evento `health`).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DE LAS COMPROBACIONES DE SALUD ---
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))
+# Una comprobación que tarda más cuenta como "unavailable"
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+# Muestreo del retardo del event loop y umbral a partir del cual el worker está degradado
+HEALTH_LOOP_LAG_INTERVAL = float(os.getenv("HEALTH_LOOP_LAG_INTERVAL", "0.5"))
+HEALTH_LOOP_LAG_DEGRADED = float(os.getenv("HEALTH_LOOP_LAG_DEGRADED", "0.25"))
+# Fracción de ocupación (0-1) del pool de conexiones y de la cola de hashing para "degraded"
+HEALTH_POOL_SATURATION = float(os.getenv("HEALTH_POOL_SATURATION", "0.9"))
+HEALTH_HASHING_SATURATION = float(os.getenv("HEALTH_HASHING_SATURATION", "0.8"))
+
+OK = "ok"
+DEGRADED = "degraded"
+UNAVAILABLE = "unavailable"
+_SEVERITY = {OK: 0, DEGRADED: 1, UNAVAILABLE: 2}
+
+Check = Callable[[], Awaitable[Tuple[str, dict]]]
+
+_JSON_HEADERS = [(b"content-type", b"application/json"), (b"cache-control", b"no-store")]
+
+
+def _encode(report: dict) -> bytes:
+    return json.dumps(report, separators=(",", ":")).encode()
+
+
+def _response_messages(status_code: int, body: bytes):
+    headers = _JSON_HEADERS + [(b"content-length", str(len(body)).encode())]
+    return (
+        {"type": "http.response.start", "status": status_code, "headers": headers},
+        {"type": "http.response.body", "body": body},
+    )
+
+
+LIVE_MESSAGES = _response_messages(200, b'{"status":"alive"}')
+_EMPTY_BODY = {"type": "http.response.body", "body": b""}
+
+
+class HealthProber:
+    """Ejecuta las comprobaciones en segundo plano y guarda la respuesta de readiness ya codificada."""
+
+    def __init__(self, checks: Dict[str, Check] = None, interval: float = HEALTH_PROBE_INTERVAL,
+                 on_change: Callable[[str], None] = None):
+        self.checks = dict(checks or {})
+        self.interval = interval
+        self.on_change = on_change
+        self.status = "starting"
+        self.report = {"status": self.status, "checks": {}}
+        self.ready_messages = _response_messages(503, _encode(self.report))
+        self.loop_lag = 0.0
+        self._lag_window = 0.0
+        self._tasks = []
+
+    def add_check(self, name: str, check: Check):
+        self.checks[name] = check
+
+    def as_metric(self) -> dict:
+        """Gravedad por comprobación (0 ok, 1 degraded, 2 unavailable) para /metrics."""
+        return {(name,): _SEVERITY.get(check["status"], 2) for name, check in self.report["checks"].items()}
+
+    async def _run_check(self, check: Check) -> Tuple[str, dict]:
+        try:
+            return await asyncio.wait_for(check(), timeout=HEALTH_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            return UNAVAILABLE, {"error": "timeout"}
+        except Exception as exc:
+            return UNAVAILABLE, {"error": type(exc).__name__}
+
+    async def probe(self) -> dict:
+        """Ejecuta todas las comprobaciones a la vez y publica el nuevo informe."""
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._run_check(self.checks[name]) for name in names))
+        # El retardo del loop se mide aparte, como máximo de la ventana desde el último informe
+        lag, self._lag_window = self._lag_window, 0.0
+        self.loop_lag = lag
+        checks = {name: {"status": status, **detail} for name, (status, detail) in zip(names, results)}
+        checks["event_loop"] = {
+            "status": DEGRADED if lag >= HEALTH_LOOP_LAG_DEGRADED else OK,
+            "lag_seconds": round(lag, 4),
+        }
+        status = max((check["status"] for check in checks.values()), key=_SEVERITY.get, default=OK)
+        self._publish({"status": status, "checks": checks, "checked_at": int(time.time())})
+        return self.report
+
+    def _publish(self, report: dict):
+        status = report["status"]
+        self.report = report
+        # "degraded" sigue atendiendo tráfico; "unavailable", "starting" y "stopping" no
+        ready = status in (OK, DEGRADED)
+        self.ready_messages = _response_messages(200 if ready else 503, _encode(report))
+        if status != self.status:
+            if self.status != "starting" or not ready:
+                logger.log(logging.INFO if status in (OK, "stopping") else logging.WARNING, "Estado de salud: %s -> %s", self.status, status)
+            self.status = status
+            if self.on_change is not None:
+                self.on_change(status)
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe()
+            except Exception:
+                logger.exception("Error en el prober de salud")
+
+    async def _lag_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + HEALTH_LOOP_LAG_INTERVAL
+            await asyncio.sleep(HEALTH_LOOP_LAG_INTERVAL)
+            lag = loop.time() - expected
+            if lag > self._lag_window:
+                self._lag_window = lag
+
+    async def start(self):
+        """Primer informe antes de aceptar tráfico y después cada `interval` segundos."""
+        await self.probe()
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._probe_loop()), asyncio.create_task(self._lag_loop())]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        # Al apagar deja de estar listo para que el balanceador retire el worker
+        self._publish({"status": "stopping", "checks": self.report.get("checks", {})})
+
+
+def database_check(engine) -> Check:
+    async def check():
+        start = time.perf_counter()
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+        return OK, {"latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    return check
+
+
+def pool_check(stats: Callable[[], dict]) -> Check:
+    last_timeouts = None
+
+    async def check():
+        nonlocal last_timeouts
+        current = stats()
+        if "size" not in current:
+            return OK, {}  # pools sin límite (SQLite)
+        capacity = current["size"] + current["max_overflow"]
+        usage = current["checked_out"] / capacity if capacity else 0.0
+        timeouts = current.get("timeouts", 0)
+        new_timeouts = 0 if last_timeouts is None else timeouts - last_timeouts
+        last_timeouts = timeouts
+        status = DEGRADED if usage >= HEALTH_POOL_SATURATION or new_timeouts else OK
+        return status, {"usage": round(usage, 3), "new_timeouts": new_timeouts}
+    return check
+
+
+def hashing_check(hasher) -> Check:
+    async def check():
+        usage = hasher.pending / hasher.max_queue
+        return (DEGRADED if usage >= HEALTH_HASHING_SATURATION else OK), {"usage": round(usage, 3)}
+    return check
+
+
+class HealthProbeMiddleware:
+    """Responde /health/live y /health/ready con mensajes ASGI precalculados."""
+
+    def __init__(self, app, prober: HealthProber):
+        self.app = app
+        self.prober = prober
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            path = scope["path"]
+            if path == "/health/live":
+                return await self._send(send, LIVE_MESSAGES, scope["method"])
+            if path == "/health/ready":
+                return await self._send(send, self.prober.ready_messages, scope["method"])
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _send(send, messages, method: str):
+        start, body = messages
+        await send(start)
+        await send(body if method == "GET" else _EMPTY_BODY)
+
+
+health_prober = HealthProber()
@@ -0,0 +1,165 @@
+"""
+Claves asimétricas para firmar JWT (ALGORITHM=EdDSA/Ed25519 o ES256/P-256) y su publicación en JWKS.
+
+Las claves privadas se leen de JWT_KEYS_DIR como `<kid>.pem`. Firma la clave activa
+(JWT_ACTIVE_KID o, si no se indica, el último kid en orden alfabético) y se publican todas,
+así los tokens firmados con claves anteriores siguen validando durante la rotación.
+
+Rotación:
+    1. python jwt_keys.py generate --algorithm EdDSA --dir keys   (nueva clave, kid con fecha)
+    2. Reiniciar: firma la clave nueva y el JWKS publica ambas.
+    3. Cuando expiren los tokens de la clave antigua (REFRESH_TOKEN_EXPIRE_DAYS), borrar su .pem.
+"""
+import argparse
+import hashlib
+import json
+import os
+import secrets
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+
+from jwt_verifier import SUPPORTED_ALGORITHMS, JWKSVerifier, b64url_encode
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DE CLAVES ---
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    raise ValueError(f"Algoritmo asimétrico no soportado: {algorithm}")
+
+
+def _check_key_type(algorithm: str, private_key):
+    expected = ed25519.Ed25519PrivateKey if algorithm == "EdDSA" else ec.EllipticCurvePrivateKey
+    if not isinstance(private_key, expected) or (
+        algorithm == "ES256" and not isinstance(private_key.curve, ec.SECP256R1)
+    ):
+        raise ValueError(f"La clave no corresponde al algoritmo {algorithm}")
+
+
+def public_jwk(algorithm: str, kid: str, private_key) -> dict:
+    """JWK pública de una clave privada."""
+    public_key = private_key.public_key()
+    if algorithm == "EdDSA":
+        raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {"kty": "OKP", "crv": "Ed25519", "x": b64url_encode(raw), "kid": kid, "alg": algorithm, "use": "sig"}
+    numbers = public_key.public_numbers()
+    return {
+        "kty": "EC",
+        "crv": "P-256",
+        "x": b64url_encode(numbers.x.to_bytes(32, "big")),
+        "y": b64url_encode(numbers.y.to_bytes(32, "big")),
+        "kid": kid,
+        "alg": algorithm,
+        "use": "sig",
+    }
+
+
+class SigningKeyring:
+    """Claves de firma de un algoritmo: firma con la activa y verifica con cualquiera."""
+
+    def __init__(self, algorithm: str, private_keys: Dict[str, object], active_kid: str):
+        if algorithm not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Algoritmo asimétrico no soportado: {algorithm}")
+        if active_kid not in private_keys:
+            raise ValueError(f"La clave activa {active_kid} no está cargada")
+        for key in private_keys.values():
+            _check_key_type(algorithm, key)
+        self.algorithm = algorithm
+        self.active_kid = active_kid
+        self._private_key = private_keys[active_kid]
+        self.jwks = {"keys": [public_jwk(algorithm, kid, key) for kid, key in sorted(private_keys.items())]}
+        # Cuerpo y ETag precalculados: el endpoint JWKS no serializa nada por petición
+        self.jwks_body = json.dumps(self.jwks, separators=(",", ":")).encode("utf-8")
+        self.jwks_etag = '"' + hashlib.sha256(self.jwks_body).hexdigest()[:32] + '"'
+        self.header = {"alg": algorithm, "typ": "JWT", "kid": active_kid}
+        self._header_b64 = b64url_encode(json.dumps(self.header, separators=(",", ":"), sort_keys=True).encode())
+        # El propio servicio verifica con las claves en memoria (sin red)
+        self.verifier = JWKSVerifier(jwks_loader=lambda: self.jwks, algorithms=(algorithm,), cache_seconds=float("inf"))
+
+    @classmethod
+    def from_directory(cls, algorithm: str, directory: str, active_kid: Optional[str] = None):
+        private_keys = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".pem"):
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                private_keys[name[:-4]] = serialization.load_pem_private_key(f.read(), password=None)
+        if not private_keys:
+            raise ValueError(f"No hay claves .pem en {directory}")
+        return cls(algorithm, private_keys, active_kid or max(private_keys))
+
+    @classmethod
+    def ephemeral(cls, algorithm: str):
+        kid = "ephemeral-" + secrets.token_hex(4)
+        return cls(algorithm, {kid: generate_private_key(algorithm)}, kid)
+
+    def sign_bytes(self, signing_input: bytes) -> bytes:
+        if self.algorithm == "EdDSA":
+            return self._private_key.sign(signing_input)
+        r, s = decode_dss_signature(self._private_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+        return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    def sign(self, claims: dict) -> str:
+        """Firma los claims (las fechas se convierten a timestamp, como hace jose)."""
+        payload = {
+            name: int(value.timestamp()) if isinstance(value, datetime) else value
+            for name, value in claims.items()
+        }
+        payload_b64 = b64url_encode(json.dumps(payload, separators=(",", ":")).encode())
+        signing_input = f"{self._header_b64}.{payload_b64}"
+        return signing_input + "." + b64url_encode(self.sign_bytes(signing_input.encode("ascii")))
+
+    def verify(self, token: str) -> dict:
+        return self.verifier.verify(token)
+
+
+def build_keyring(algorithm: str) -> Optional[SigningKeyring]:
+    """Keyring para el algoritmo configurado; None con algoritmos HMAC (HS256)."""
+    if algorithm.startswith("HS"):
+        return None
+    if JWT_KEYS_DIR:
+        keyring = SigningKeyring.from_directory(algorithm, JWT_KEYS_DIR, JWT_ACTIVE_KID or None)
+        logger.info("Firmando JWT con %s, kid activo %s", algorithm, keyring.active_kid)
+        return keyring
+    logger.warning(
+        "ALGORITHM=%s sin JWT_KEYS_DIR: se usa una clave efímera (no válida con varios workers)", algorithm
+    )
+    return SigningKeyring.ephemeral(algorithm)
+
+
+def _generate_command(args):
+    os.makedirs(args.dir, exist_ok=True)
+    kid = args.kid or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    path = os.path.join(args.dir, f"{kid}.pem")
+    if os.path.exists(path):
+        raise SystemExit(f"Ya existe {path}")
+    pem = generate_private_key(args.algorithm).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    # Solo legible por el propietario
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    print(f"Clave {args.algorithm} creada: {path} (kid={kid})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    generate = subparsers.add_parser("generate", help="Genera una nueva clave de firma")
+    generate.add_argument("--algorithm", choices=SUPPORTED_ALGORITHMS, default="EdDSA")
+    generate.add_argument("--dir", default="keys")
+    generate.add_argument("--kid", help="Identificador de la clave (por defecto, fecha UTC)")
+    _generate_command(parser.parse_args())
@@ -0,0 +1,184 @@
+"""
+Verificación local de JWT firmados con EdDSA (Ed25519) o ES256 a partir de un JWKS.
+
+Pensado para que otros servicios validen los tokens de esta API sin llamarla en cada
+petición: descargan una vez `/.well-known/jwks.json`, guardan las claves ya parseadas por
+`kid` y solo vuelven a descargar cuando caduca la caché o aparece un `kid` desconocido
+(rotación de claves). Solo depende de `cryptography` y de la librería estándar.
+
+Uso:
+    verifier = JWKSVerifier("https://auth.example.com/.well-known/jwks.json")
+    claims = verifier.verify(token)  # lanza InvalidToken si no es válido
+"""
+import base64
+import json
+import re
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, Optional, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+SUPPORTED_ALGORITHMS = ("EdDSA", "ES256")
+
+
+class InvalidToken(Exception):
+    """El token no tiene formato válido, la firma no cuadra o ha expirado."""
+
+
+def b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def public_key_from_jwk(jwk: dict):
+    """Convierte una JWK pública (OKP/Ed25519 o EC/P-256) en un objeto de clave."""
+    kty, crv = jwk.get("kty"), jwk.get("crv")
+    if kty == "OKP" and crv == "Ed25519":
+        return ed25519.Ed25519PublicKey.from_public_bytes(b64url_decode(jwk["x"]))
+    if kty == "EC" and crv == "P-256":
+        x = int.from_bytes(b64url_decode(jwk["x"]), "big")
+        y = int.from_bytes(b64url_decode(jwk["y"]), "big")
+        return ec.EllipticCurvePublicNumbers(x, y, ec.SECP256R1()).public_key()
+    raise ValueError(f"JWK no soportada: kty={kty} crv={crv}")
+
+
+def verify_signature(algorithm: str, key, signing_input: bytes, signature: bytes) -> bool:
+    try:
+        if algorithm == "EdDSA" and isinstance(key, ed25519.Ed25519PublicKey):
+            key.verify(signature, signing_input)
+            return True
+        if algorithm == "ES256" and isinstance(key, ec.EllipticCurvePublicKey):
+            # JWS usa r||s de 32 bytes cada uno; cryptography espera DER
+            if len(signature) != 64:
+                return False
+            r = int.from_bytes(signature[:32], "big")
+            s = int.from_bytes(signature[32:], "big")
+            key.verify(encode_dss_signature(r, s), signing_input, ec.ECDSA(hashes.SHA256()))
+            return True
+    except InvalidSignature:
+        return False
+    return False
+
+
+class JWKSVerifier:
+    """
+    Verifica tokens con las claves de un JWKS, cacheadas ya parseadas.
+
+    - jwks_url: URL del JWKS (se respeta `Cache-Control: max-age`).
+    - jwks_loader: alternativa a la URL; función que devuelve el JWKS como dict.
+    - cache_seconds: vigencia de las claves si la respuesta no indica max-age.
+    - min_refresh_interval: espera mínima entre descargas forzadas por un `kid` desconocido.
+    """
+
+    def __init__(
+        self,
+        jwks_url: Optional[str] = None,
+        jwks_loader: Optional[Callable[[], dict]] = None,
+        algorithms=SUPPORTED_ALGORITHMS,
+        cache_seconds: float = 300,
+        min_refresh_interval: float = 30,
+        leeway: float = 0,
+        timeout: float = 5,
+    ):
+        if jwks_url is None and jwks_loader is None:
+            raise ValueError("Se necesita jwks_url o jwks_loader")
+        self.jwks_url = jwks_url
+        self.jwks_loader = jwks_loader
+        self.algorithms = frozenset(algorithms)
+        self.cache_seconds = cache_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self.leeway = leeway
+        self.timeout = timeout
+        self._keys: Dict[str, Tuple[str, object]] = {}
+        self._expires_at = 0.0
+        self._last_fetch = float("-inf")
+        self._lock = threading.Lock()
+
+    def _fetch(self) -> Tuple[dict, float]:
+        if self.jwks_loader is not None:
+            return self.jwks_loader(), self.cache_seconds
+        request = urllib.request.Request(self.jwks_url, headers={"Accept": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            max_age = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+            return json.load(response), float(max_age.group(1)) if max_age else self.cache_seconds
+
+    def load_jwks(self, jwks: dict, ttl: Optional[float] = None):
+        """Sustituye las claves cacheadas por las del JWKS dado."""
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            algorithm = jwk.get("alg")
+            if jwk.get("use", "sig") != "sig" or algorithm not in self.algorithms or "kid" not in jwk:
+                continue
+            keys[jwk["kid"]] = (algorithm, public_key_from_jwk(jwk))
+        now = time.monotonic()
+        self._keys = keys
+        self._expires_at = now + (self.cache_seconds if ttl is None else ttl)
+        self._last_fetch = now
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now < self._expires_at:
+                return
+            if force and now - self._last_fetch < self.min_refresh_interval:
+                return
+            jwks, ttl = self._fetch()
+            self.load_jwks(jwks, ttl)
+
+    def get_key(self, kid: str) -> Tuple[str, object]:
+        if time.monotonic() >= self._expires_at:
+            self.refresh()
+        entry = self._keys.get(kid)
+        if entry is None:
+            # Posible rotación: clave nueva todavía no descargada
+            self.refresh(force=True)
+            entry = self._keys.get(kid)
+            if entry is None:
+                raise InvalidToken(f"kid desconocido: {kid}")
+        return entry
+
+    def verify(self, token: str) -> dict:
+        """Valida firma, `exp` y `nbf`. Devuelve los claims."""
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(b64url_decode(header_b64))
+            signature = b64url_decode(signature_b64)
+            # UnicodeEncodeError (ValueError) si algún segmento no es ASCII
+            signing_input = f"{header_b64}.{payload_b64}".encode("ascii")
+        except (ValueError, TypeError, AttributeError) as exc:
+            raise InvalidToken("Token mal formado") from exc
+        if not isinstance(header, dict):
+            raise InvalidToken("Cabecera mal formada")
+
+        algorithm = header.get("alg")
+        if algorithm not in self.algorithms:
+            raise InvalidToken(f"Algoritmo no permitido: {algorithm}")
+        key_algorithm, key = self.get_key(header.get("kid"))
+        if key_algorithm != algorithm:
+            raise InvalidToken("El algoritmo no coincide con la clave")
+        if not verify_signature(algorithm, key, signing_input, signature):
+            raise InvalidToken("Firma inválida")
+
+        try:
+            claims = json.loads(b64url_decode(payload_b64))
+        except ValueError as exc:
+            raise InvalidToken("Payload mal formado") from exc
+        if not isinstance(claims, dict):
+            raise InvalidToken("Payload mal formado")
+        now = time.time()
+        try:
+            if "exp" in claims and now > claims["exp"] + self.leeway:
+                raise InvalidToken("Token expirado")
+            if "nbf" in claims and now < claims["nbf"] - self.leeway:
+                raise InvalidToken("Token todavía no válido")
+        except TypeError as exc:
+            raise InvalidToken("exp/nbf no numéricos") from exc
+        return claims
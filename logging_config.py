@@ -1,11 +1,19 @@
 """
 Módulo de logging estructurado para la aplicación.
 Configura logs con formato estructurado y niveles apropiados.
+
+Los handlers reciben los registros a través de una cola: el código de la petición solo
+encola el registro y un hilo en segundo plano los formatea y escribe a disco/consola.
 """
+import atexit
+import json
 import logging
 import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, timezone
 
 # Crear directorio de logs si no existe
 LOG_DIR = "logs"
@@ -13,7 +21,18 @@ if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
 # Nombre del archivo de log con timestamp
-LOG_FILE = os.path.join(LOG_DIR, f"api_{datetime.now().strftime('%Y-%m-%d')}.log")
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(LOG_DIR, f"api_{datetime.now().strftime('%Y-%m-%d')}.log"))
+LOG_MAX_SIZE = int(os.getenv("LOG_MAX_SIZE", str(10 * 1024 * 1024)))  # 10MB
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "10"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Niveles por logger: "sqlalchemy.engine=WARNING,main=DEBUG"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Formato del archivo: "json" (estructurado) o "text"
+LOG_FORMAT_NAME = os.getenv("LOG_FORMAT", "json")
+# Muestreo de eventos frecuentes: "clave=N/segundos", p. ej. "health=1/60,login_failed=20/60"
+LOG_SAMPLE_RULES = os.getenv("LOG_SAMPLE_RULES", "health=1/60,login_failed=20/60")
+# Máximo de registros pendientes en la cola; si se llena se descartan en lugar de bloquear
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
 # Formato detallado para los logs
 LOG_FORMAT = logging.Formatter(
@@ -21,34 +40,178 @@ LOG_FORMAT = logging.Formatter(
     datefmt="%Y-%m-%d %H:%M:%S"
 )
 
+# Atributos estándar de LogRecord que no se copian como campos extra en JSON
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON con los campos `extra` incluidos."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Limita los registros marcados con `extra={"sample_key": ...}` a N por ventana.
+    Los registros sin `sample_key` pasan siempre.
+    """
+
+    def __init__(self, rules: dict):
+        super().__init__()
+        # clave -> (máximo, ventana en segundos)
+        self.rules = rules
+        self._windows = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @staticmethod
+    def parse_rules(spec: str) -> dict:
+        rules = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, rate = item.partition("=")
+            limit, _, seconds = rate.partition("/")
+            rules[key.strip()] = (int(limit), float(seconds or 1))
+        return rules
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        rule = self.rules.get(key) if key is not None else None
+        if rule is None:
+            return True
+        limit, window = rule
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._windows.get(key, (now, 0))
+            if now - start >= window:
+                start, count = now, 0
+            if count >= limit:
+                self._windows[key] = (start, count)
+                self.dropped += 1
+                return False
+            self._windows[key] = (start, count + 1)
+        return True
+
+
+class QueryRedactionFilter(logging.Filter):
+    """
+    Oculta la query string de las rutas indicadas en el log de acceso de uvicorn
+    (args: cliente, método, ruta con query, versión HTTP, estado).
+    """
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = tuple(paths)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args
+        if isinstance(args, tuple) and len(args) == 5 and isinstance(args[2], str):
+            path, sep, _ = args[2].partition("?")
+            if sep and path in self.paths:
+                record.args = args[:2] + (f"{path}?[redacted]",) + args[3:]
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que registra: el mensaje se construye
+    en el listener. Si la cola está llena descarta el registro en lugar de bloquear.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_queue_handler = None
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
 def setup_logging():
     """Configura el logging estructurado para toda la aplicación."""
-    
+    global _listener, _queue_handler
+
     # Logger raíz
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    
+    root_logger.setLevel(LOG_LEVEL.upper())
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is not None:
+        return root_logger
+
     # Handler para archivo (rotando cada 10MB, máximo 10 archivos)
     file_handler = logging.handlers.RotatingFileHandler(
         LOG_FILE,
-        maxBytes=10 * 1024 * 1024,  # 10MB
-        backupCount=10
+        maxBytes=LOG_MAX_SIZE,
+        backupCount=LOG_BACKUP_COUNT,
     )
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(LOG_FORMAT)
-    
+    file_handler.setFormatter(JsonFormatter() if LOG_FORMAT_NAME == "json" else LOG_FORMAT)
+
     # Handler para consola
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(LOG_FORMAT)
-    
+
+    # El hilo listener escribe en los handlers reales; el resto solo encola
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(SamplingFilter.parse_rules(LOG_SAMPLE_RULES)))
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logging)
+
     # Agregar handlers
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
-    
+    root_logger.addHandler(queue_handler)
+    _queue_handler = queue_handler
+
     return root_logger
 
 
+def shutdown_logging():
+    """Vacía la cola y detiene el hilo listener."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 # Loggers específicos para módulos
 def get_logger(name: str) -> logging.Logger:
     """Obtiene un logger configurado para un módulo específico."""
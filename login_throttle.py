@@ -0,0 +1,136 @@
+"""
+Freno de fuerza bruta / credential stuffing en /token antes de tocar la base de datos.
+
+Los fallos de login se cuentan por usuario y por IP en un count-min sketch (memoria fija,
+independiente del número de claves) cuyos contadores se reducen a la mitad cada
+LOGIN_THROTTLE_HALF_LIFE segundos. Con esos conteos:
+- Tras LOGIN_FREE_ATTEMPTS fallos, cada intento espera un retardo exponencial (sin CPU).
+- A partir del umbral de bloqueo se responde 429 sin consultar la base ni calcular Argon2.
+
+El sketch solo sobreestima. Para que un atacante no pueda bloquear a otro usuario
+fabricando colisiones, los hashes usan una sal aleatoria por proceso. Además, un
+par (usuario, IP) con un login correcto reciente no se ve afectado por el bloqueo del usuario.
+"""
+import hashlib
+import math
+import os
+import secrets
+import time
+from array import array
+from typing import NamedTuple
+
+from cache import LRUCache
+
+# --- CONFIGURACIÓN DEL FRENO DE LOGIN ---
+LOGIN_THROTTLE_ENABLED = os.getenv("LOGIN_THROTTLE_ENABLED", "true").lower() not in ("0", "false", "no")
+LOGIN_THROTTLE_WIDTH = int(os.getenv("LOGIN_THROTTLE_WIDTH", "16384"))
+LOGIN_THROTTLE_DEPTH = int(os.getenv("LOGIN_THROTTLE_DEPTH", "4"))
+LOGIN_THROTTLE_HALF_LIFE = float(os.getenv("LOGIN_THROTTLE_HALF_LIFE", "600"))
+LOGIN_FREE_ATTEMPTS = int(os.getenv("LOGIN_FREE_ATTEMPTS", "3"))
+LOGIN_DELAY_BASE = float(os.getenv("LOGIN_DELAY_BASE", "0.25"))
+LOGIN_DELAY_MAX = float(os.getenv("LOGIN_DELAY_MAX", "4"))
+LOGIN_LOCKOUT_USER = int(os.getenv("LOGIN_LOCKOUT_USER", "10"))
+LOGIN_LOCKOUT_IP = int(os.getenv("LOGIN_LOCKOUT_IP", "50"))
+LOGIN_TRUSTED_TTL = float(os.getenv("LOGIN_TRUSTED_TTL", str(7 * 86400)))
+
+
+class CountMinSketch:
+    """Count-min sketch con decaimiento: los contadores se dividen entre 2 cada `half_life`."""
+
+    def __init__(self, width: int, depth: int, half_life: float):
+        self.width = width
+        self.depth = depth
+        self.half_life = half_life
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+        self._salt = secrets.token_bytes(16)
+        self.next_decay = time.monotonic() + half_life
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16, key=self._salt).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def _maybe_decay(self, now: float):
+        if now < self.next_decay:
+            return
+        # Si pasaron varios periodos se aplican todos de golpe
+        periods = int((now - self.next_decay) // self.half_life) + 1
+        shift = min(periods, 32)
+        for i, row in enumerate(self._rows):
+            self._rows[i] = array("I", (value >> shift for value in row))
+        self.next_decay += periods * self.half_life
+
+    def add(self, key: str, amount: int = 1, now: float = None) -> int:
+        """Suma `amount` y devuelve la nueva estimación."""
+        self._maybe_decay(time.monotonic() if now is None else now)
+        estimate = None
+        for row, index in zip(self._rows, self._indexes(key)):
+            value = min(row[index] + amount, 0xFFFFFFFF)
+            row[index] = value
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key: str, now: float = None) -> int:
+        self._maybe_decay(time.monotonic() if now is None else now)
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def clear(self):
+        for row in self._rows:
+            for index in range(self.width):
+                row[index] = 0
+
+
+class ThrottleDecision(NamedTuple):
+    locked: bool
+    delay: float
+    retry_after: int
+
+
+_ALLOW = ThrottleDecision(False, 0.0, 0)
+
+
+class LoginThrottle:
+    """Política de retardo y bloqueo a partir de los fallos por usuario y por IP."""
+
+    def __init__(self, enabled: bool = LOGIN_THROTTLE_ENABLED):
+        self.enabled = enabled
+        self.failures = CountMinSketch(LOGIN_THROTTLE_WIDTH, LOGIN_THROTTLE_DEPTH, LOGIN_THROTTLE_HALF_LIFE)
+        self._trusted = LRUCache(maxsize=100_000, ttl=LOGIN_TRUSTED_TTL)
+        self.free_attempts = LOGIN_FREE_ATTEMPTS
+        self.lockout_user = LOGIN_LOCKOUT_USER
+        self.lockout_ip = LOGIN_LOCKOUT_IP
+
+    def check(self, username: str, ip: str) -> ThrottleDecision:
+        """Decide antes de consultar la base: bloquear, retrasar o dejar pasar."""
+        if not self.enabled:
+            return _ALLOW
+        now = time.monotonic()
+        ip_failures = self.failures.estimate("ip:" + ip, now)
+        # Un dispositivo con login correcto reciente no sufre los ataques dirigidos al usuario
+        trusted = self._trusted.get((username, ip)) is not None
+        user_failures = 0 if trusted else self.failures.estimate("user:" + username, now)
+
+        if user_failures >= self.lockout_user or ip_failures >= self.lockout_ip:
+            return ThrottleDecision(True, 0.0, max(1, math.ceil(self.failures.next_decay - now)))
+        excess = max(user_failures, ip_failures) - self.free_attempts
+        if excess < 0:
+            return _ALLOW
+        return ThrottleDecision(False, min(LOGIN_DELAY_MAX, LOGIN_DELAY_BASE * 2 ** excess), 0)
+
+    def record_failure(self, username: str, ip: str):
+        if self.enabled:
+            now = time.monotonic()
+            self.failures.add("user:" + username, now=now)
+            self.failures.add("ip:" + ip, now=now)
+
+    def record_success(self, username: str, ip: str):
+        if self.enabled:
+            self._trusted.set((username, ip), True)
+
+    def reset(self):
+        self.failures.clear()
+        self._trusted.clear()
+
+
+login_throttle = LoginThrottle()
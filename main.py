@@ -3,56 +3,118 @@
 API de Autenticación de Usuarios con FastAPI.
 Proporciona endpoints para registro, login y acceso a datos de usuario autenticado.
 """
+import asyncio
+import os
+import signal
+import threading
+import time
+
+_import_started = time.perf_counter()  # inicio de la fase "imports" del arranque
+
 from dotenv import load_dotenv
 
 load_dotenv()  # Carga las variables de entorno desde el archivo .env
 
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import timedelta
-from slowapi import Limiter
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
-from logging_config import setup_logging, get_logger
+from logging_config import QueryRedactionFilter, setup_logging, shutdown_logging, get_logger
 
 # Configurar logging
 setup_logging()
 logger = get_logger(__name__)
+# El ticket de /events va en la URL: que no quede en el log de acceso de uvicorn
+get_logger("uvicorn.access").addFilter(QueryRedactionFilter(("/events",)))
 
 import crud, models, schemas
 from auth import (
-    create_access_token,
-    create_refresh_token,
+    create_token_pair,
     get_current_user,
-    get_current_user_from_refresh_token,
-    verify_password,
+    get_access_token_claims,
+    get_events_ticket_claims,
+    create_events_ticket,
+    EVENTS_TICKET_SECONDS,
+    get_refresh_token_claims,
+    RefreshClaims,
+    verify_password_async,
+    verify_dummy_password,
+    prepare_dummy_hash,
+    warm_up_tokens,
+    get_password_hash_async,
+    password_needs_rehash,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     REFRESH_TOKEN_EXPIRE_DAYS,
+    token_cache,
+    require_admin,
+    signing_keys,
+    JWKS_MAX_AGE,
 )
+from ratelimit import NativeRateLimiter, RateLimitMiddleware
+import database
 from database import engine, get_db
+from hashing import HashingQueueFull, password_hasher
+from profiler import ProfilerMiddleware, request_profiler
+from login_throttle import login_throttle
+from metrics import HASH_SECONDS, LOGIN_THROTTLE, MetricsMiddleware, RATE_LIMIT_REJECTIONS, registry as metrics_registry
+from revocation import REVOCATION_SYNC_SECONDS, revocation_store
+from username_index import username_index
+from events import EventStream, EventStreamFull, event_broadcaster
+from health import HealthProbeMiddleware, LIVE_MESSAGES, database_check, hashing_check, health_prober, pool_check
+from serialization import FAST_JSON, FastJSONResponse, token_response, user_response
+from startup import STARTUP_POOL_CONNECTIONS, STARTUP_SCHEMA, STARTUP_WARMUP, ensure_schema, startup_report
 
-# --- CONFIGURACIÓN DE RATE LIMITING ---
-limiter = Limiter(key_func=get_remote_address)
+startup_report.record("imports", time.perf_counter() - _import_started)
 
+# --- CONFIGURACIÓN DE RATE LIMITING ---
+# memory:// (por proceso), shm://NOMBRE (compartido entre workers del host)
+# o redis://HOST:PUERTO (compartido entre réplicas; requiere el paquete redis).
+# Cada petición es un único incremento atómico en el backend, sin agrupar en lotes.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+if RATE_LIMIT_STORAGE_URI.startswith("shm://"):
+    import ratelimit_storage  # noqa: F401 - registra el esquema shm:// en limits (solo POSIX)
+# Solo para benchmarks de carga: RATE_LIMIT_ENABLED=false desactiva todos los límites
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+limiter = Limiter(
+    key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI, enabled=RATE_LIMIT_ENABLED
+)
 
-async def create_db_and_tables():
-    """Crea las tablas de la base de datos al iniciar la aplicación."""
-    async with engine.begin() as conn:
-        await conn.run_sync(models.Base.metadata.create_all)
+# "slowapi" (decoradores, almacenamiento compartido) o "native" (middleware ASGI en
+# memoria del proceso, O(1) por petición y cabeceras X-RateLimit-*)
+RATE_LIMIT_ENGINE = os.getenv("RATE_LIMIT_ENGINE", "slowapi")
+# /register/batch ya exige X-Admin-Token; el límite solo protege el pool de hashing
+RATE_LIMIT_REGISTER_BATCH = os.getenv("RATE_LIMIT_REGISTER_BATCH", "60/minute")
+native_limiter = NativeRateLimiter(
+    {
+        ("POST", "/register"): "5/minute",
+        ("POST", "/register/batch"): RATE_LIMIT_REGISTER_BATCH,
+        ("POST", "/token"): "10/minute",
+    },
+    enabled=RATE_LIMIT_ENABLED and RATE_LIMIT_ENGINE == "native",
+)
+if RATE_LIMIT_ENGINE == "native":
+    limiter.enabled = False
 
 
 app = FastAPI(
     title="API de Autenticación de Usuarios",
     description="API simple y segura para autenticar usuarios con JWT",
     version="1.0.0",
+    # FAST_JSON=true: orjson para las respuestas y serializadores directos en los endpoints calientes
+    default_response_class=FastJSONResponse if FAST_JSON else JSONResponse,
 )
 
 # Agregar rate limiter a la app
 app.state.limiter = limiter
+if RATE_LIMIT_ENGINE == "native":
+    app.add_middleware(RateLimitMiddleware, limiter=native_limiter)
 
 # Configurar CORS para permitir que el frontend acceda a la API
 app.add_middleware(
@@ -63,6 +125,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiler opcional (desactivado por defecto, se activa en /admin/profiler)
+app.add_middleware(ProfilerMiddleware, profiler=request_profiler)
+
+# Métricas: el middleware más externo para medir la petición completa
+app.add_middleware(MetricsMiddleware, streaming_routes=("/events",))
+
+# Sondas de salud: por fuera de todo, con respuestas precalculadas (ver health.py)
+app.add_middleware(HealthProbeMiddleware, prober=health_prober)
+
 
 # --- EXCEPTION HANDLERS PERSONALIZADOS ---
 @app.exception_handler(RequestValidationError)
@@ -100,19 +171,284 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     }
 
 
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Cuenta los rechazos de slowapi y delega en su respuesta estándar (429)."""
+    RATE_LIMIT_REJECTIONS.inc("slowapi")
+    return _rate_limit_exceeded_handler(request, exc)
+
+
+@app.exception_handler(HashingQueueFull)
+async def hashing_queue_full_handler(request: Request, exc: HashingQueueFull):
+    """
+    Responde 503 cuando el pool de hashing está saturado, en lugar de encolar sin límite.
+    """
+    logger.warning("Cola de hashing llena, rechazando %s", request.url.path)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servicio ocupado, inténtalo de nuevo en unos segundos"},
+        headers={"Retry-After": "1"},
+    )
+
+
+async def sync_revocations():
+    """
+    Carga en memoria las revocaciones hechas por otros workers.
+    Cada cierto tiempo reconstruye el estado completo (el Bloom no olvida) y purga la tabla.
+    """
+    async with database.async_session() as db:
+        database.use_primary(db)
+        now = int(time.time())
+        if revocation_store.needs_rebuild():
+            await crud.delete_expired_revocations(db, now)
+            revocation_store.reset()
+        revocation_store.apply_rows(await crud.get_revocations(db, revocation_store.last_id, now))
+
+
+async def revocation_sync_loop():
+    while True:
+        try:
+            await sync_revocations()
+        except Exception:
+            logger.exception("Error sincronizando revocaciones de tokens")
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+
+
+_background_tasks = set()
+
+health_prober.add_check("database", database_check(engine))
+health_prober.add_check("db_pool", pool_check(database.pool_stats))
+health_prober.add_check("hashing", hashing_check(password_hasher))
+health_prober.on_change = lambda status: event_broadcaster.set_health({"status": status})
+
+
+async def warm_up_hashing():
+    with startup_report.phase("hashing"):
+        await password_hasher.warm_up()
+        await prepare_dummy_hash()
+
+
+async def warm_up_db_pools():
+    with startup_report.phase("db_pool"):
+        for target in [engine, *database.replica_engines]:
+            try:
+                await database.warm_pool(target, STARTUP_POOL_CONNECTIONS)
+            except Exception:
+                # No impide arrancar: el pool abrirá las conexiones bajo demanda
+                logger.warning("No se pudo precalentar el pool de %s", target.url.render_as_string(), exc_info=True)
+
+
+def _close_event_streams_on_exit():
+    """
+    Cierra los streams SSE al recibir SIGTERM/SIGINT. uvicorn espera a que terminen las
+    peticiones en curso antes de apagar, y un stream inactivo no terminaría nunca.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return  # p. ej. TestClient: las señales solo se capturan en el hilo principal
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(event_broadcaster.close)
+            previous(signum, frame)
+
+        signal.signal(sig, handler)
+
+
 @app.on_event("startup")
 async def on_startup():
-    """Evento que se ejecuta al iniciar la aplicación."""
-    await create_db_and_tables()
+    """Evento que se ejecuta al iniciar la aplicación (cada fase queda en startup_report)."""
+    hashing_warm_up = None
+    if STARTUP_WARMUP:
+        # Argon2 corre en el pool de hashing mientras se prepara la base de datos
+        hashing_warm_up = asyncio.create_task(warm_up_hashing())
+    if STARTUP_SCHEMA != "skip":
+        with startup_report.phase("schema"):
+            await ensure_schema(engine)
+    await warm_up_db_pools()
+    with startup_report.phase("username_index"):
+        async with database.async_session() as db:
+            await username_index.build(crud.stream_usernames(db))
+    if hashing_warm_up is not None:
+        with startup_report.phase("jwt"):
+            warm_up_tokens()
+        await hashing_warm_up
+    _background_tasks.add(asyncio.create_task(revocation_sync_loop()))
+    event_broadcaster.start()
+    with startup_report.phase("health"):
+        await health_prober.start()
+    _close_event_streams_on_exit()
+    startup_report.finish(app.version, _import_started)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Evento que se ejecuta al detener la aplicación."""
+    for task in _background_tasks:
+        task.cancel()
+    health_prober.stop()
+    event_broadcaster.close()
+    password_hasher.shutdown(wait=False)
+    shutdown_logging()
 
 
 @app.get("/health", tags=["health"])
 async def health_check():
     """Verifica que la API está funcionando correctamente."""
-    logger.info("Health check ejecutado")
+    logger.info("Health check ejecutado", extra={"sample_key": "health"})
     return {"status": "ok", "message": "API running"}
 
 
+# Estas rutas documentan las sondas en OpenAPI; HealthProbeMiddleware las responde antes
+def _probe_response(messages) -> Response:
+    start, body = messages
+    return Response(body["body"], status_code=start["status"], headers={"Cache-Control": "no-store"}, media_type="application/json")
+
+
+@app.get("/health/live", tags=["health"], summary="Liveness")
+async def health_live():
+    """El proceso responde. Sin E/S ni log: apto para sondeos muy frecuentes."""
+    return _probe_response(LIVE_MESSAGES)
+
+
+@app.get(
+    "/health/ready",
+    tags=["health"],
+    summary="Readiness",
+    responses={503: {"description": "Arrancando, apagando o con una dependencia caída"}},
+)
+async def health_ready():
+    """
+    Último informe del prober en segundo plano (base de datos, pools y event loop).
+    200 si el estado es `ok` o `degraded`, 503 en otro caso. No ejecuta comprobaciones.
+    """
+    return _probe_response(health_prober.ready_messages)
+
+
+@app.post(
+    "/events/ticket",
+    response_model=schemas.EventsTicket,
+    tags=["events"],
+    summary="Ticket para abrir el canal de eventos",
+    responses={401: {"description": "Token inválido o no proporcionado"}},
+)
+async def events_ticket(claims: dict = Depends(get_access_token_claims)):
+    """
+    Cambia el access token (cabecera Authorization) por un ticket de un solo uso y
+    EVENTS_TICKET_SECONDS de vigencia para `GET /events?ticket=`.
+    """
+    return {"ticket": create_events_ticket(claims), "expires_in": EVENTS_TICKET_SECONDS}
+
+
+@app.get(
+    "/events",
+    tags=["events"],
+    summary="Canal de eventos (SSE)",
+    response_class=EventStream,
+    responses={
+        200: {"description": "Stream text/event-stream con eventos `health`, `token_expiring` y `token_expired`"},
+        401: {"description": "Ticket inválido, caducado o ya usado"},
+        503: {"description": "Demasiadas conexiones de eventos abiertas"},
+    },
+)
+async def events(claims: dict = Depends(get_events_ticket_claims)):
+    """
+    Sustituye al polling del frontend: envía el estado de la API cuando cambia y avisa
+    antes de que caduque el access token. Se abre con `?ticket=` de POST /events/ticket
+    (EventSource no admite cabeceras). El stream se cierra al caducar el access token.
+    """
+    try:
+        queue = event_broadcaster.subscribe()
+    except EventStreamFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas conexiones de eventos abiertas",
+            headers={"Retry-After": "5"},
+        )
+    return EventStream(event_broadcaster, queue, expires_at=claims.get("exp"))
+
+
+# --- MÉTRICAS ---
+def _pool_gauge(key):
+    return lambda: database.pool_stats().get(key)
+
+
+metrics_registry.gauge("db_pool_size", "Tamaño configurado del pool de conexiones", _pool_gauge("size"))
+metrics_registry.gauge("db_pool_checked_out", "Conexiones del pool en uso", _pool_gauge("checked_out"))
+metrics_registry.gauge("db_pool_overflow", "Conexiones abiertas por encima del tamaño del pool", _pool_gauge("overflow"))
+metrics_registry.gauge("db_pool_checkouts_total", "Checkouts totales del pool", _pool_gauge("checkouts"), kind="counter")
+metrics_registry.gauge("db_pool_timeouts_total", "Timeouts esperando conexión del pool", _pool_gauge("timeouts"), kind="counter")
+metrics_registry.gauge(
+    "db_pool_wait_seconds_total", "Tiempo total esperando conexión del pool", _pool_gauge("wait_total_seconds"), kind="counter"
+)
+metrics_registry.gauge(
+    "startup_phase_seconds", "Duración de cada fase del arranque del worker", startup_report.as_metric, labelnames=("phase",)
+)
+metrics_registry.gauge(
+    "health_check_status", "Estado de cada comprobación de salud (0 ok, 1 degraded, 2 unavailable)",
+    health_prober.as_metric, labelnames=("check",)
+)
+metrics_registry.gauge("event_loop_lag_seconds", "Retardo máximo del event loop en el último intervalo", lambda: health_prober.loop_lag)
+metrics_registry.gauge("sse_connections", "Conexiones SSE abiertas en /events", lambda: event_broadcaster.connections)
+metrics_registry.gauge(
+    "sse_dropped_total", "Conexiones SSE cerradas por no consumir eventos", lambda: event_broadcaster.dropped, kind="counter"
+)
+metrics_registry.gauge("username_index_items", "Usuarios en el índice de pertenencia", lambda: username_index.stats()["items"])
+metrics_registry.gauge("hashing_pending", "Operaciones de hashing en vuelo o en cola", lambda: password_hasher.pending)
+metrics_registry.gauge(
+    "token_cache_requests_total", "Consultas a la caché de tokens por resultado",
+    lambda: {("hit",): token_cache.hits, ("miss",): token_cache.misses}, ("result",), kind="counter",
+)
+
+
+def _hashing_avoided_seconds():
+    # Bloqueos del freno de login x coste medio observado de una verificación Argon2
+    verify = HASH_SECONDS.labels("verify")
+    if not verify.count:
+        return 0
+    return LOGIN_THROTTLE.value("locked") * verify.sum / verify.count
+
+
+metrics_registry.gauge(
+    "login_hashing_avoided_total", "Verificaciones Argon2 evitadas por el freno de login",
+    lambda: LOGIN_THROTTLE.value("locked"), kind="counter",
+)
+metrics_registry.gauge(
+    "login_hashing_avoided_seconds_total", "Tiempo de CPU de Argon2 evitado (estimado) por el freno de login",
+    _hashing_avoided_seconds, kind="counter",
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Exporta las métricas en formato de texto de Prometheus."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+# JWKS vacío con HS256: no hay claves públicas que publicar
+_EMPTY_JWKS = b'{"keys":[]}'
+
+
+@app.get("/.well-known/jwks.json", tags=["auth"], summary="Claves públicas de firma (JWKS)")
+async def jwks(request: Request):
+    """
+    Publica las claves públicas con las que se firman los tokens (ALGORITHM=EdDSA/ES256)
+    para que otros servicios los verifiquen localmente (ver `jwt_verifier.JWKSVerifier`).
+    Cacheable: responde 304 si `If-None-Match` coincide con el ETag.
+    """
+    if signing_keys is None:
+        body, etag = _EMPTY_JWKS, '"empty"'
+    else:
+        body, etag = signing_keys.jwks_body, signing_keys.jwks_etag
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={JWKS_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @app.post(
     "/register",
     response_model=schemas.UserInDB,
@@ -134,19 +470,100 @@ async def register(request: Request, user: schemas.UserCreate, db: AsyncSession
     
     **Rate Limit**: 5 registros por minuto por IP
     """
-    logger.info(f"Intento de registro para usuario: {user.username}")
-    db_user = await crud.get_user_by_username(db, username=user.username)
-    if db_user:
-        logger.warning(f"Intento de registrar usuario duplicado: {user.username}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El nombre de usuario ya está registrado",
-        )
-    new_user = await crud.create_user(db=db, user=user)
-    logger.info(f"Usuario registrado exitosamente: {user.username}")
+    logger.info("Intento de registro para usuario: %s", user.username)
+    duplicate_exception = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="El nombre de usuario ya está registrado",
+    )
+    # El alta es atómica y detecta duplicados por sí sola; el SELECT previo solo se hace si
+    # el índice cree que el nombre existe, para no gastar un hash Argon2 en un duplicado
+    if username_index.might_exist(user.username):
+        db_user = await crud.get_user_by_username(db, username=user.username)
+        if db_user:
+            logger.warning("Intento de registrar usuario duplicado: %s", user.username)
+            raise duplicate_exception
+    result = await crud.create_user(db=db, user=user)
+    if not result.created:
+        logger.warning("Intento de registrar usuario duplicado: %s", user.username)
+        raise duplicate_exception
+    new_user = result.user
+    logger.info("Usuario registrado exitosamente: %s", user.username)
+    if FAST_JSON:
+        return user_response(new_user, status_code=status.HTTP_201_CREATED)
     return new_user
 
 
+@app.post(
+    "/register/batch",
+    response_model=schemas.UserBatchResult,
+    tags=["auth"],
+    summary="Registrar usuarios en lote",
+    dependencies=[Depends(require_admin)],
+    responses={
+        200: {"description": "Lote procesado; el resultado de cada usuario va en `results`"},
+        403: {"description": "Falta la cabecera X-Admin-Token o no es válida"},
+    },
+)
+@limiter.limit(RATE_LIMIT_REGISTER_BATCH)
+async def register_batch(request: Request, batch: schemas.UserBatchCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Registra muchos usuarios en una sola petición (onboarding desde sistemas externos).
+    Requiere la cabecera `X-Admin-Token`.
+    
+    - **users**: Lista de usuarios (máximo REGISTER_BATCH_MAX_SIZE, 1000 por defecto) con `username` y `password`
+    
+    Los usuarios ya existentes o repetidos en el lote se devuelven con estado `duplicate`.
+    
+    **Rate Limit**: RATE_LIMIT_REGISTER_BATCH por IP (60 lotes por minuto por defecto)
+    """
+    result = await crud.create_users_batch(db, batch.users)
+    logger.info("Registro en lote: %d creados, %d duplicados", result.created, result.duplicates)
+    return result
+
+
+async def _load_usernames_after(after_id: int):
+    async with database.async_session() as db:
+        database.use_primary(db)
+        return await crud.get_usernames_after(db, after_id)
+
+
+async def username_might_exist(username: str) -> bool:
+    """
+    Consulta el índice; ante un negativo lo pone al día con los usuarios de otros workers.
+    Si la puesta al día no se hizo para esta petición, devuelve True y se consulta la base.
+    """
+    if username_index.might_exist(username):
+        return True
+    try:
+        if not await username_index.catch_up(_load_usernames_after):
+            return True
+    except Exception:
+        logger.exception("Error actualizando el índice de usuarios; se consulta la base")
+        return True
+    return username_index.might_exist(username)
+
+
+# Usuarios con un rehash ya programado (evita duplicarlo con logins concurrentes)
+_rehash_in_flight = set()
+
+
+async def rehash_password(user_id: int, old_hash: str, password: str):
+    """
+    Recalcula el hash con los parámetros Argon2 actuales.
+    Se ejecuta como tarea en segundo plano tras enviar la respuesta del login.
+    """
+    try:
+        new_hash = await get_password_hash_async(password)
+        async with database.async_session() as db:
+            database.use_primary(db)
+            updated = await crud.update_password_hash(db, user_id, old_hash, new_hash)
+        logger.info("Hash de contraseña actualizado para el usuario %s: %s", user_id, updated)
+    except Exception:
+        logger.exception("Error actualizando el hash de contraseña del usuario %s", user_id)
+    finally:
+        _rehash_in_flight.discard(user_id)
+
+
 @app.post(
     "/token",
     response_model=schemas.Token,
@@ -159,7 +576,10 @@ async def register(request: Request, user: schemas.UserCreate, db: AsyncSession
 )
 @limiter.limit("10/minute")  # Máximo 10 intentos de login por minuto por IP
 async def login_for_access_token(
-    request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
+    request: Request,
+    background_tasks: BackgroundTasks,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene un token JWT para acceder a endpoints protegidos.
@@ -169,24 +589,52 @@ async def login_for_access_token(
     
     **Rate Limit**: 10 intentos por minuto por IP (previene fuerza bruta)
     """
-    logger.info(f"Intento de login para usuario: {form_data.username}")
-    user = await crud.get_user_by_username(db, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        logger.warning(f"Login fallido para usuario: {form_data.username}")
+    logger.debug("Intento de login para usuario: %s", form_data.username)
+    client_ip = get_remote_address(request)
+    decision = login_throttle.check(form_data.username, client_ip)
+    if decision.locked:
+        # Rechazo antes de la consulta y de Argon2: es lo que hace barato el ataque para nosotros
+        LOGIN_THROTTLE.inc("locked")
+        logger.warning(
+            "Login bloqueado para usuario: %s desde %s", form_data.username, client_ip,
+            extra={"sample_key": "login_failed"},
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos fallidos, inténtalo más tarde",
+            headers={"Retry-After": str(decision.retry_after)},
+        )
+    if decision.delay:
+        LOGIN_THROTTLE.inc("delayed")
+        await asyncio.sleep(decision.delay)
+
+    user = None
+    if await username_might_exist(form_data.username):
+        # Las credenciales se leen del primario: con réplicas, un usuario recién registrado
+        # o una contraseña recién cambiada podrían no haber llegado aún
+        database.use_primary(db)
+        user = await crud.get_user_by_username(db, username=form_data.username)
+    if user is None:
+        # Usuario inexistente: verificación ficticia para no revelarlo por el tiempo de respuesta
+        await verify_dummy_password(form_data.password)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
+        login_throttle.record_failure(form_data.username, client_ip)
+        logger.warning(
+            "Login fallido para usuario: %s", form_data.username, extra={"sample_key": "login_failed"}
+        )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nombre de usuario o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    refresh_token_expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    refresh_token = create_refresh_token(
-        data={"sub": user.username}, expires_delta=refresh_token_expires
-    )
-    logger.info(f"Login exitoso para usuario: {form_data.username}")
+    login_throttle.record_success(form_data.username, client_ip)
+    if password_needs_rehash(user.hashed_password) and user.id not in _rehash_in_flight:
+        _rehash_in_flight.add(user.id)
+        background_tasks.add_task(rehash_password, user.id, user.hashed_password, form_data.password)
+    access_token, refresh_token = create_token_pair(user.username, user.token_generation)
+    logger.info("Login exitoso para usuario: %s", form_data.username)
+    if FAST_JSON:
+        return token_response(access_token, refresh_token, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -213,14 +661,16 @@ async def read_users_me(
     Devuelve la información del usuario actualmente autenticado.
     Requiere un token JWT válido en el header `Authorization: Bearer <token>`.
     """
-    logger.info(f"Acceso a /users/me por: {current_user}")
-    user = await crud.get_user_by_username(db, username=current_user)
+    logger.debug("Acceso a /users/me por: %s", current_user)
+    user = await crud.get_user_profile(db, username=current_user)
     if user is None:
-        logger.warning(f"Usuario no encontrado: {current_user}")
+        logger.warning("Usuario no encontrado: %s", current_user)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado",
         )
+    if FAST_JSON:
+        return user_response(user)
     return user
 
 
@@ -234,25 +684,110 @@ async def read_users_me(
         401: {"description": "Token de refresco inválido o expirado"},
     },
 )
-async def refresh_token(current_user: str = Depends(get_current_user_from_refresh_token)):
+async def refresh_token(
+    claims: RefreshClaims = Depends(get_refresh_token_claims), db: AsyncSession = Depends(get_db)
+):
     """
-    Obtiene un nuevo access token usando un refresh token válido.
+    Obtiene un nuevo par de tokens usando un refresh token válido.
     
     El refresh token debe ser enviado en el header `Authorization: Bearer <refresh_token>`.
-    Los refresh tokens son válidos por 7 días.
+    Los refresh tokens son válidos por 7 días y de un solo uso: cada refresco devuelve
+    uno nuevo y el anterior queda revocado.
     """
-    logger.info(f"Token refrescado para usuario: {current_user}")
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": current_user}, expires_delta=access_token_expires
-    )
-    refresh_token_expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    refresh_token = create_refresh_token(
-        data={"sub": current_user}, expires_delta=refresh_token_expires
-    )
+    current_user = claims.username
+    if not await crud.consume_refresh_token(db, claims.jti, current_user, claims.generation, claims.expires_at):
+        revocation_store.revoke(claims.jti, claims.expires_at)
+        logger.warning("Refresh token reutilizado o revocado para usuario: %s", current_user)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de refresco inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    revocation_store.revoke(claims.jti, claims.expires_at)
+    logger.info("Token refrescado para usuario: %s", current_user)
+    access_token, refresh_token = create_token_pair(current_user, claims.generation)
+    if FAST_JSON:
+        return token_response(access_token, refresh_token, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
         "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    }
\ No newline at end of file
+    }
+
+
+@app.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["auth"],
+    summary="Revocar el refresh token actual",
+    responses={401: {"description": "Token de refresco inválido o ya revocado"}},
+)
+async def logout(claims: RefreshClaims = Depends(get_refresh_token_claims), db: AsyncSession = Depends(get_db)):
+    """
+    Revoca el refresh token enviado en `Authorization: Bearer <refresh_token>`.
+    El access token sigue siendo válido hasta que expire.
+    """
+    if not await crud.consume_refresh_token(db, claims.jti, claims.username, claims.generation, claims.expires_at):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de refresco inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    revocation_store.revoke(claims.jti, claims.expires_at)
+    logger.info("Logout de usuario: %s", claims.username)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.post(
+    "/users/me/revoke-all",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["users"],
+    summary="Cerrar todas las sesiones",
+    responses={401: {"description": "Token inválido o no proporcionado"}},
+)
+async def revoke_all_sessions(current_user: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Revoca todos los refresh tokens del usuario autenticado (todas las sesiones).
+    Los access tokens ya emitidos siguen siendo válidos hasta que expiren.
+    """
+    expires_at = int(time.time()) + REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    generation = await crud.revoke_all_refresh_tokens(db, current_user, expires_at)
+    if generation is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    revocation_store.revoke_all(current_user, generation, expires_at)
+    logger.info("Revocadas todas las sesiones de %s (generación %d)", current_user, generation)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.get(
+    "/admin/profiler",
+    response_model=schemas.ProfilerStatus,
+    tags=["admin"],
+    summary="Estado del profiler de peticiones",
+    dependencies=[Depends(require_admin)],
+)
+async def get_profiler():
+    """Devuelve la configuración actual del profiler. Requiere la cabecera `X-Admin-Token`."""
+    return request_profiler.status()
+
+
+@app.put(
+    "/admin/profiler",
+    response_model=schemas.ProfilerStatus,
+    tags=["admin"],
+    summary="Activar o configurar el profiler sin reiniciar",
+    dependencies=[Depends(require_admin)],
+)
+async def configure_profiler(settings: schemas.ProfilerSettings):
+    """
+    Activa, desactiva o ajusta el profiler en caliente.
+    Los perfiles se guardan en `logs/profiles`. Requiere la cabecera `X-Admin-Token`.
+    
+    - **enabled**: Activa o desactiva el profiler
+    - **mode**: `sampling` (stacks colapsados) o `cprofile` (.prof)
+    - **sample_rate**: Fracción de peticiones perfiladas (0-1)
+    - **slow_ms**: Perfila cualquier petición más lenta que este umbral
+    """
+    request_profiler.configure(**settings.model_dump(exclude_none=True))
+    return request_profiler.status()
@@ -0,0 +1,245 @@
+"""
+Métricas en formato de exposición de Prometheus (texto), sin dependencias externas.
+
+Los contadores e histogramas se actualizan solo desde el hilo del event loop, así que
+no necesitan locks; los buckets de cada serie se reservan al crearla.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Tuple
+
+# Buckets por defecto (segundos), pensados para latencias de API
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Contador monótono con etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class _Timer:
+    """Context manager que observa la duración del bloque en un histograma."""
+    __slots__ = ("_series", "_start")
+
+    def __init__(self, series):
+        self._series = series
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._series.observe(time.perf_counter() - self._start)
+
+
+class _HistogramSeries:
+    """Una serie (combinación de etiquetas) con sus buckets preasignados."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram:
+    """Histograma con buckets fijos y etiquetas."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+
+    def labels(self, *labels) -> _HistogramSeries:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(self.buckets)
+        return series
+
+    def observe(self, value: float, *labels):
+        self.labels(*labels).observe(value)
+
+    def time(self, *labels) -> _Timer:
+        return _Timer(self.labels(*labels))
+
+    def collect(self) -> Iterable[str]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_format_value(series.sum)}"
+            yield f"{self.name}_count{label_str} {series.count}"
+
+
+class CallbackGauge:
+    """
+    Métrica cuyo valor se calcula al exportar (p. ej. estado del pool de conexiones).
+    Con kind="counter" sirve para exponer contadores que ya mantiene otro componente.
+    """
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float], labelnames: Iterable[str] = (), kind: str = "gauge"):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Sin etiquetas devuelve un número; con etiquetas, un dict {tupla_etiquetas: valor}
+        self.callback = callback
+
+    def collect(self) -> Iterable[str]:
+        value = self.callback()
+        if value is None:
+            return
+        if isinstance(value, dict):
+            for labels, item in value.items():
+                yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(item)}"
+        else:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class Registry:
+    """Conjunto de métricas exportadas en /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable, labelnames: Iterable[str] = (), kind: str = "gauge") -> CallbackGauge:
+        return self.register(CallbackGauge(name, help, callback, labelnames, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                lines.extend(metric.collect())
+            except Exception as exc:
+                # Una métrica rota no debe romper la exportación del resto
+                lines.append(f"# ERROR {metric.name}: {_escape(exc)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- MÉTRICAS DE LA APLICACIÓN ---
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Peticiones HTTP por ruta y código de estado", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+)
+JWT_SECONDS = registry.histogram(
+    "jwt_operation_seconds", "Tiempo de codificación/decodificación de JWT", ("operation",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+HASH_SECONDS = registry.histogram(
+    "password_hash_seconds", "Tiempo de cálculo de Argon2 en el worker", ("operation",),
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_seconds", "Tiempo de las operaciones de base de datos de crud", ("operation",),
+)
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "rate_limit_rejections_total", "Peticiones rechazadas por rate limiting", ("engine",)
+)
+LOGIN_THROTTLE = registry.counter(
+    "login_throttle_total", "Intentos de login retrasados o bloqueados antes de verificar", ("action",)
+)
+REVOCATION_CHECKS = registry.counter(
+    "refresh_revocation_checks_total", "Comprobaciones en memoria de revocación de refresh tokens", ("result",)
+)
+
+_UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que registra latencia y código de estado por plantilla de ruta."""
+
+    def __init__(self, app, streaming_routes: Iterable[str] = ()):
+        self.app = app
+        # Rutas de streaming (SSE): duran lo que la conexión, se cuentan pero sin latencia
+        self.streaming_routes = frozenset(streaming_routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Se etiqueta por plantilla (/users/me), no por path concreto, para acotar series
+            route = getattr(scope.get("route"), "path", _UNMATCHED_ROUTE)
+            method = scope["method"]
+            if route not in self.streaming_routes:
+                HTTP_LATENCY.observe(time.perf_counter() - start, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status_code))
@@ -14,4 +14,29 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, server_default=func.now())
+    # Se incrementa para revocar todos los refresh tokens del usuario ("cerrar todas las sesiones").
+    # En bases existentes la añade la migración 2 de startup.py (_add_token_generation)
+    token_generation = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class RevokedToken(Base):
+    """
+    Revocación durable de refresh tokens.
+    Una fila con `generation` revoca todos los tokens del usuario con una generación menor.
+    """
+    __tablename__ = "revoked_tokens"
+    
+    id = Column(Integer, primary_key=True)
+    jti = Column(String, unique=True, nullable=False)
+    username = Column(String, index=True, nullable=False)
+    generation = Column(Integer, nullable=True)
+    expires_at = Column(Integer, index=True, nullable=False)  # timestamp UNIX del `exp`
+
+
+class SchemaVersion(Base):
+    """Versión del esquema aplicada por startup.py (una sola fila)."""
+    __tablename__ = "schema_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
@@ -0,0 +1,212 @@
+"""
+Profiling opcional de peticiones lentas o muestreadas.
+
+Desactivado por defecto; se activa con PROFILER_ENABLED o en caliente desde /admin/profiler.
+Dos modos:
+- "sampling": un hilo toma muestras periódicas de la pila del event loop mientras hay
+  peticiones perfiladas y guarda stacks colapsados (.collapsed) para flamegraphs.
+- "cprofile": cProfile durante la petición (.prof, se abre con pstats o snakeviz).
+  Solo una petición a la vez; con el event loop compartido incluye trabajo concurrente.
+
+Se guarda el perfil de las peticiones muestreadas (PROFILER_SAMPLE_RATE) y de las que
+superan PROFILER_SLOW_MS, en logs/profiles con retención acotada por número y tamaño.
+"""
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from logging_config import LOG_DIR, get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DEL PROFILER ---
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILER_MODE = os.getenv("PROFILER_MODE", "sampling")  # sampling | cprofile
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0.01"))
+PROFILER_SLOW_MS = float(os.getenv("PROFILER_SLOW_MS", "500"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_DIR = os.getenv("PROFILER_DIR", os.path.join(LOG_DIR, "profiles"))
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
+PROFILER_MAX_BYTES = int(os.getenv("PROFILER_MAX_BYTES", str(50 * 1024 * 1024)))  # 50MB
+
+MODES = ("sampling", "cprofile")
+
+
+class StackSampler:
+    """Hilo que muestrea la pila de un hilo objetivo y reparte las muestras entre colectores."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._collectors = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._target_id = None
+
+    def add(self, collector: Counter):
+        with self._lock:
+            self._collectors[id(collector)] = collector
+            self._target_id = threading.get_ident()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, collector: Counter):
+        with self._lock:
+            self._collectors.pop(id(collector), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._collectors:
+                    self._thread = None
+                    return
+                collectors = list(self._collectors.values())
+                target_id = self._target_id
+            frame = sys._current_frames().get(target_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            collapsed = ";".join(reversed(stack))
+            for collector in collectors:
+                collector[collapsed] += 1
+
+
+class RequestProfiler:
+    """Estado y política del profiler; modificable en caliente."""
+
+    def __init__(self):
+        self.enabled = PROFILER_ENABLED
+        self.mode = PROFILER_MODE
+        self.sample_rate = PROFILER_SAMPLE_RATE
+        self.slow_ms = PROFILER_SLOW_MS
+        self.directory = PROFILER_DIR
+        self.max_files = PROFILER_MAX_FILES
+        self.max_bytes = PROFILER_MAX_BYTES
+        self.saved = 0
+        self._sampler = StackSampler(PROFILER_INTERVAL_MS / 1000)
+        self._cprofile_busy = False
+
+    def configure(self, enabled=None, mode=None, sample_rate=None, slow_ms=None):
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"Modo de profiler inválido: {mode}")
+        if enabled is not None:
+            self.enabled = enabled
+        if mode is not None:
+            self.mode = mode
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        logger.info(
+            "Profiler configurado: enabled=%s mode=%s sample_rate=%s slow_ms=%s",
+            self.enabled, self.mode, self.sample_rate, self.slow_ms,
+        )
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "directory": self.directory,
+            "saved": self.saved,
+        }
+
+    def should_keep(self, sampled: bool, elapsed_ms: float) -> bool:
+        return sampled or (self.slow_ms > 0 and elapsed_ms >= self.slow_ms)
+
+    def _filename(self, method: str, path: str, elapsed_ms: float, extension: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return os.path.join(self.directory, f"{stamp}_{method}_{slug}_{int(elapsed_ms)}ms.{extension}")
+
+    def _enforce_retention(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            full = os.path.join(self.directory, name)
+            if os.path.isfile(full):
+                stat = os.stat(full)
+                entries.append((stat.st_mtime, stat.st_size, full))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_files or total > self.max_bytes):
+            _, size, full = entries.pop(0)
+            os.remove(full)
+            total -= size
+
+    def _write(self, method: str, path: str, elapsed_ms: float, profile=None, samples: Counter = None):
+        os.makedirs(self.directory, exist_ok=True)
+        if profile is not None:
+            filename = self._filename(method, path, elapsed_ms, "prof")
+            profile.dump_stats(filename)
+        else:
+            filename = self._filename(method, path, elapsed_ms, "collapsed")
+            with open(filename, "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        self._enforce_retention()
+        return filename
+
+    async def save(self, method: str, path: str, elapsed_ms: float, profile=None, samples: Counter = None):
+        # La escritura a disco se hace fuera del event loop
+        filename = await asyncio.to_thread(self._write, method, path, elapsed_ms, profile, samples)
+        self.saved += 1
+        logger.info("Perfil guardado (%.1f ms): %s", elapsed_ms, filename)
+
+
+class ProfilerMiddleware:
+    """Middleware ASGI; con el profiler desactivado su coste es una comprobación de atributo."""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        if scope["type"] != "http" or not profiler.enabled:
+            return await self.app(scope, receive, send)
+
+        sampled = random.random() < profiler.sample_rate
+        if not sampled and profiler.slow_ms <= 0:
+            return await self.app(scope, receive, send)
+
+        if profiler.mode == "cprofile":
+            if profiler._cprofile_busy:
+                return await self.app(scope, receive, send)
+            import cProfile
+            profile, samples = cProfile.Profile(), None
+            profiler._cprofile_busy = True
+            profile.enable()
+        else:
+            profile, samples = None, Counter()
+            profiler._sampler.add(samples)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if profile is not None:
+                profile.disable()
+                profiler._cprofile_busy = False
+            else:
+                profiler._sampler.remove(samples)
+            if profiler.should_keep(sampled, elapsed_ms) and (profile is not None or samples):
+                try:
+                    await profiler.save(scope["method"], scope["path"], elapsed_ms, profile, samples)
+                except OSError as exc:
+                    logger.warning("No se pudo guardar el perfil: %s", exc)
+
+
+request_profiler = RequestProfiler()
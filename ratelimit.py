@@ -0,0 +1,156 @@
+"""
+Rate limiting nativo en ASGI con contador de ventana deslizante.
+Alternativa de bajo coste al decorador de slowapi: O(1) por petición y estado compacto por clave.
+
+El estado vive en memoria del proceso; para límites globales entre workers usar
+slowapi con RATE_LIMIT_STORAGE_URI=shm:// o redis://.
+"""
+import json
+import math
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from metrics import RATE_LIMIT_REJECTIONS
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Convierte "5/minute" en (5, 60.0)."""
+    amount, _, period = rate.partition("/")
+    period = period.strip().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Periodo de rate limit inválido: {rate}")
+    return int(amount), float(_PERIODS[period])
+
+
+class _Window:
+    """Estado de una clave: ventana actual, contador previo y actual."""
+    __slots__ = ("index", "previous", "current")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.previous = 0
+        self.current = 0
+
+
+class SlidingWindowCounter:
+    """
+    Contador de ventana deslizante: estima las peticiones del último periodo ponderando
+    el contador de la ventana anterior. Las claves inactivas se purgan por TTL.
+    """
+
+    def __init__(self, limit: int, period: float, max_keys: int = 100_000):
+        self.limit = limit
+        self.period = period
+        self.max_keys = max_keys
+        self._windows: Dict[str, _Window] = {}
+        self._next_sweep = 0.0
+
+    def hit(self, key: str, now: Optional[float] = None) -> Tuple[bool, int, float]:
+        """Registra una petición. Devuelve (permitida, restantes, segundos hasta reset)."""
+        if now is None:
+            now = time.monotonic()
+        index = int(now // self.period)
+        window = self._windows.get(key)
+        if window is None:
+            if len(self._windows) >= self.max_keys or now >= self._next_sweep:
+                self._sweep(index, now)
+            window = self._windows[key] = _Window(index)
+        elif window.index != index:
+            window.previous = window.current if window.index == index - 1 else 0
+            window.current = 0
+            window.index = index
+
+        elapsed = now - index * self.period
+        estimate = window.previous * (1 - elapsed / self.period) + window.current
+        reset_after = self.period - elapsed
+        if estimate + 1 > self.limit:
+            return False, 0, reset_after
+        window.current += 1
+        return True, max(0, math.floor(self.limit - estimate - 1)), reset_after
+
+    def _sweep(self, index: int, now: float):
+        # Una clave sin actividad en las dos últimas ventanas ya no aporta nada
+        stale = [key for key, window in self._windows.items() if window.index < index - 1]
+        for key in stale:
+            del self._windows[key]
+        if len(self._windows) >= self.max_keys:
+            # Sigue lleno: se descartan las claves más antiguas (orden de inserción)
+            for key in list(self._windows)[: len(self._windows) - self.max_keys + 1]:
+                del self._windows[key]
+        self._next_sweep = now + self.period
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+def client_ip(scope: dict) -> str:
+    """Clave por defecto: la IP del cliente (equivalente a get_remote_address)."""
+    client = scope.get("client")
+    return client[0] if client else "127.0.0.1"
+
+
+class NativeRateLimiter:
+    """Reglas de rate limit por (método, ruta), cada una con su contador."""
+
+    def __init__(self, rules: Dict[Tuple[str, str], str], key_func: Callable = client_ip, enabled: bool = True):
+        self.key_func = key_func
+        self.enabled = enabled
+        self.rejected = 0
+        self._rules = {
+            route: SlidingWindowCounter(*parse_rate(rate)) for route, rate in rules.items()
+        }
+
+    def check(self, scope: dict):
+        """Devuelve None si la ruta no tiene límite, o (permitida, límite, restantes, reset)."""
+        counter = self._rules.get((scope["method"], scope["path"]))
+        if counter is None:
+            return None
+        allowed, remaining, reset_after = counter.hit(self.key_func(scope))
+        if not allowed:
+            self.rejected += 1
+            RATE_LIMIT_REJECTIONS.inc("native")
+        return allowed, counter.limit, remaining, reset_after
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que aplica un NativeRateLimiter y añade cabeceras X-RateLimit-*."""
+
+    def __init__(self, app, limiter: NativeRateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            return await self.app(scope, receive, send)
+        result = self.limiter.check(scope)
+        if result is None:
+            return await self.app(scope, receive, send)
+
+        allowed, limit, remaining, reset_after = result
+        rate_headers = [
+            (b"x-ratelimit-limit", str(limit).encode()),
+            (b"x-ratelimit-remaining", str(remaining).encode()),
+            (b"x-ratelimit-reset", str(math.ceil(reset_after)).encode()),
+        ]
+        if not allowed:
+            body = json.dumps({"error": f"Rate limit exceeded: {limit} per window"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": rate_headers + [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(reset_after)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + rate_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,165 @@
+"""
+Almacenamiento de contadores de rate limiting compartido entre workers.
+Registra el esquema `shm://` en la librería `limits` (usada por slowapi).
+
+Formato del URI: shm://NOMBRE?slots=65536
+Todos los workers de un mismo host que usen el mismo NOMBRE comparten contadores.
+Solo en sistemas POSIX (bloqueo con `flock`); main.py importa este módulo únicamente
+cuando RATE_LIMIT_STORAGE_URI empieza por shm://.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from urllib.parse import parse_qs, urlparse
+
+from limits.errors import ConfigurationError
+from limits.storage import Storage
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Cada slot: hash de la clave (u64, 0 = libre), contador (i64), expiración epoch (f64)
+_SLOT = struct.Struct("<Qqd")
+# Slots consecutivos que se revisan a partir de la posición inicial de una clave
+_PROBE = 16
+
+
+def _open_segment(name: str, size: int) -> shared_memory.SharedMemory:
+    """Crea el segmento o se adjunta si otro worker ya lo creó."""
+    try:
+        segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        segment = shared_memory.SharedMemory(name=name)
+    # El segmento debe sobrevivir a la salida de cualquier worker individual
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    return segment
+
+
+class SharedMemoryStorage(Storage):
+    """
+    Tabla hash de tamaño fijo en memoria compartida (ventana fija).
+    Las actualizaciones son atómicas entre procesos mediante `flock` y, cuando la
+    zona de sondeo está llena, se expulsa la entrada que antes expira.
+    """
+
+    STORAGE_SCHEME = ["shm"]
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, **options):
+        if fcntl is None:
+            raise ConfigurationError("shm:// necesita un sistema POSIX; usa memory:// o redis://")
+        parsed = urlparse(uri or "shm://ratelimit")
+        query = parse_qs(parsed.query)
+        self.name = parsed.netloc or "ratelimit"
+        self.slots = int(options.get("slots", query.get("slots", ["65536"])[0]))
+        self._segment = _open_segment(self.name, self.slots * _SLOT.size)
+        # Si el segmento ya existía, su tamaño manda
+        self.slots = self._segment.size // _SLOT.size
+        self._buf = self._segment.buf
+        lock_path = os.path.join(tempfile.gettempdir(), f"{self.name}.ratelimit.lock")
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        # flock no excluye a hilos del mismo proceso; se combina con un lock local
+        self._thread_lock = threading.Lock()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return OSError
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    def _find(self, key_hash: int, now: float):
+        """Devuelve (slot de la clave o None, slot candidato para insertar)."""
+        start = key_hash % self.slots
+        candidate, candidate_expiry = None, None
+        for offset in range(min(_PROBE, self.slots)):
+            index = (start + offset) % self.slots
+            slot_hash, _, expiry = _SLOT.unpack_from(self._buf, index * _SLOT.size)
+            if slot_hash == key_hash:
+                return index, index
+            # Slots libres o caducados son los mejores candidatos; si no, el que antes expira
+            effective = 0.0 if slot_hash == 0 or expiry <= now else expiry
+            if candidate is None or effective < candidate_expiry:
+                candidate, candidate_expiry = index, effective
+        return None, candidate
+
+    def _read(self, key: str):
+        now = time.time()
+        with self._locked():
+            index, _ = self._find(self._hash(key), now)
+            if index is None:
+                return 0, now
+            _, count, expiry = _SLOT.unpack_from(self._buf, index * _SLOT.size)
+        if expiry <= now:
+            return 0, now
+        return count, expiry
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        key_hash = self._hash(key)
+        now = time.time()
+        with self._locked():
+            index, candidate = self._find(key_hash, now)
+            count, slot_expiry = 0, 0.0
+            if index is not None:
+                _, count, slot_expiry = _SLOT.unpack_from(self._buf, index * _SLOT.size)
+            else:
+                index = candidate
+            if slot_expiry <= now:
+                count, slot_expiry = 0, now + expiry
+            count += amount
+            _SLOT.pack_into(self._buf, index * _SLOT.size, key_hash, count, slot_expiry)
+        return count
+
+    def get(self, key: str) -> int:
+        return self._read(key)[0]
+
+    def get_expiry(self, key: str) -> float:
+        return self._read(key)[1]
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> int:
+        with self._locked():
+            self._buf[:] = bytes(len(self._buf))
+        return self.slots
+
+    def clear(self, key: str) -> None:
+        with self._locked():
+            index, _ = self._find(self._hash(key), time.time())
+            if index is not None:
+                _SLOT.pack_into(self._buf, index * _SLOT.size, 0, 0, 0.0)
+
+    def close(self):
+        """Libera el mapeo local (el segmento sigue disponible para otros workers)."""
+        self._buf = None
+        self._segment.close()
+        os.close(self._lock_fd)
+
+    def unlink(self):
+        """Elimina el segmento compartido del sistema."""
+        # unlink() desregistra del resource_tracker; se registra antes para que sea simétrico
+        from multiprocessing import resource_tracker
+        resource_tracker.register(self._segment._name, "shared_memory")
+        self._segment.unlink()
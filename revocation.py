@@ -0,0 +1,116 @@
+"""
+Revocación de refresh tokens en memoria, sin consultas a la base de datos.
+
+Capas:
+1. Filtro de Bloom con todos los `jti` revocados: un negativo descarta la revocación al instante.
+2. Conjunto exacto jti -> exp, acotado a REVOCATION_MAX_ENTRIES y purgado al expirar.
+3. Tabla `revoked_tokens` (durable). Solo hace falta cuando el Bloom da positivo y el
+   conjunto exacto ya no tiene la entrada; en /refresh lo resuelve la propia inserción de
+   rotación, que falla si el `jti` ya estaba consumido.
+
+"Revocar todo" de un usuario sube su generación: los tokens con `gen` menor quedan revocados.
+
+Cada worker sincroniza periódicamente las filas nuevas de la tabla (ver main.py), así que
+las revocaciones hechas en otro proceso se reflejan en memoria en REVOCATION_SYNC_SECONDS.
+"""
+import heapq
+import os
+import time
+from typing import Dict, Tuple
+
+from bloom import BloomFilter
+
+# --- CONFIGURACIÓN DE REVOCACIÓN ---
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "1000000"))
+REVOCATION_BLOOM_ERROR = float(os.getenv("REVOCATION_BLOOM_ERROR", "0.001"))
+REVOCATION_MAX_ENTRIES = int(os.getenv("REVOCATION_MAX_ENTRIES", "200000"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "3600"))
+
+# Resultados de RevocationStore.check
+CLEAN = "clean"
+REVOKED = "revoked"
+MAYBE = "maybe"
+
+
+class RevocationStore:
+    """Estado de revocación del proceso."""
+
+    def __init__(
+        self,
+        capacity: int = REVOCATION_BLOOM_CAPACITY,
+        error_rate: float = REVOCATION_BLOOM_ERROR,
+        max_entries: int = REVOCATION_MAX_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked: Dict[str, int] = {}
+        self._expiry = []  # heap de (exp, jti) para purgar por orden de expiración
+        self._generations: Dict[str, Tuple[int, int]] = {}  # username -> (generación mínima, exp)
+        self.last_id = 0  # última fila de revoked_tokens aplicada
+        self.loaded_at = 0.0
+
+    def _evict(self, now: float):
+        expiry, revoked = self._expiry, self._revoked
+        while expiry and (expiry[0][0] <= now or len(revoked) > self.max_entries):
+            exp, jti = heapq.heappop(expiry)
+            # Lo evictado por tamaño sigue en el Bloom: se resolverá en la capa durable
+            if revoked.get(jti) == exp:
+                del revoked[jti]
+
+    def revoke(self, jti: str, expires_at: int):
+        if jti in self._revoked:
+            return
+        self._bloom.add(jti)
+        self._revoked[jti] = expires_at
+        heapq.heappush(self._expiry, (expires_at, jti))
+        self._evict(time.time())
+
+    def revoke_all(self, username: str, generation: int, expires_at: int):
+        """Revoca los tokens de `username` con generación menor que `generation`."""
+        current = self._generations.get(username)
+        if current is None or generation > current[0]:
+            self._generations[username] = (generation, expires_at)
+
+    def check(self, jti: str, username: str, generation: int) -> str:
+        """CLEAN si no está revocado, REVOKED si seguro que sí, MAYBE si hay que confirmarlo."""
+        minimum = self._generations.get(username)
+        if minimum is not None and generation < minimum[0]:
+            return REVOKED
+        if jti not in self._bloom:
+            return CLEAN
+        if jti in self._revoked:
+            return REVOKED
+        return MAYBE
+
+    def apply_rows(self, rows):
+        """Aplica filas de revoked_tokens (cargadas o sincronizadas desde la base de datos)."""
+        for row in rows:
+            if row.generation is not None:
+                self.revoke_all(row.username, row.generation, row.expires_at)
+            else:
+                self.revoke(row.jti, row.expires_at)
+            self.last_id = max(self.last_id, row.id)
+
+    def reset(self):
+        """Vacía el estado; tras esto hay que recargar todas las filas vigentes."""
+        self._bloom.clear()
+        self._revoked.clear()
+        self._expiry.clear()
+        self._generations.clear()
+        self.last_id = 0
+        self.loaded_at = time.monotonic()
+
+    def needs_rebuild(self) -> bool:
+        """El Bloom no olvida: se reconstruye periódicamente o al superar su capacidad."""
+        return self._bloom.saturated or time.monotonic() - self.loaded_at >= REVOCATION_REBUILD_SECONDS
+
+    def stats(self) -> dict:
+        return {
+            "bloom_items": self._bloom.count,
+            "exact_entries": len(self._revoked),
+            "generations": len(self._generations),
+        }
+
+
+revocation_store = RevocationStore()
@@ -3,9 +3,13 @@
 Esquemas Pydantic para validación de datos.
 Define los modelos de entrada y salida de la API.
 """
+import os
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
+
+# Usuarios por petición en /register/batch
+REGISTER_BATCH_MAX_SIZE = int(os.getenv("REGISTER_BATCH_MAX_SIZE", "1000"))
 
 class Token(BaseModel):
     """Esquema para la respuesta de tokens JWT."""
@@ -27,4 +31,44 @@ class UserInDB(UserBase):
     id: int
     created_at: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserBatchCreate(BaseModel):
+    """Esquema para registrar usuarios en lote."""
+    users: List[UserCreate] = Field(..., min_length=1, max_length=REGISTER_BATCH_MAX_SIZE, description="Usuarios a registrar")
+
+class UserBatchItemResult(BaseModel):
+    """Resultado del registro de un usuario dentro de un lote."""
+    username: str
+    status: Literal["created", "duplicate"] = Field(..., description="Resultado del registro")
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class UserBatchResult(BaseModel):
+    """Esquema para la respuesta del registro en lote."""
+    created: int = Field(..., description="Usuarios creados")
+    duplicates: int = Field(..., description="Usuarios ya existentes o repetidos en el lote")
+    results: List[UserBatchItemResult]
+
+
+class ProfilerSettings(BaseModel):
+    """Esquema para modificar el profiler en caliente; los campos omitidos no cambian."""
+    enabled: Optional[bool] = None
+    mode: Optional[Literal["sampling", "cprofile"]] = None
+    sample_rate: Optional[float] = Field(default=None, ge=0, le=1, description="Fracción de peticiones perfiladas")
+    slow_ms: Optional[float] = Field(default=None, ge=0, description="Umbral de petición lenta (0 = desactivado)")
+
+class ProfilerStatus(BaseModel):
+    """Esquema para el estado actual del profiler."""
+    enabled: bool
+    mode: str
+    sample_rate: float
+    slow_ms: float
+    directory: str
+    saved: int
+
+class EventsTicket(BaseModel):
+    """Esquema para el ticket de un solo uso con el que se abre /events."""
+    ticket: str = Field(..., description="Se pasa como `?ticket=` a GET /events")
+    expires_in: int = Field(..., description="Segundos de validez del ticket")
@@ -0,0 +1,79 @@
+"""
+Serialización rápida de respuestas JSON (opcional, FAST_JSON=true).
+
+- FastJSONResponse: clase de respuesta por defecto basada en orjson (si está instalado).
+- token_response / user_response: serializadores precompilados para `schemas.Token` y
+  `schemas.UserInDB`. Los handlers ya construyen datos válidos, así que se devuelven los
+  bytes directamente y FastAPI omite la revalidación con `response_model` (que se mantiene
+  solo para la documentación OpenAPI).
+"""
+import json
+import os
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DE SERIALIZACIÓN ---
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+if FAST_JSON and orjson is None:
+    logger.warning("FAST_JSON activo sin el paquete orjson; se usa el encoder json estándar")
+
+
+def _default(value):
+    # Solo para el fallback sin orjson: fechas en ISO 8601 como hace Pydantic
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Serializa a JSON compacto en bytes con orjson, o con json si no está disponible."""
+    if orjson is not None:
+        # OPT_UTC_Z: las fechas UTC salen con "Z", igual que en Pydantic
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con orjson."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# Partes fijas del JSON de Token. Los JWT solo contienen caracteres base64url y puntos,
+# así que se pueden insertar sin escapar.
+_TOKEN_PREFIX = b'{"access_token":"'
+_TOKEN_MIDDLE = b'","refresh_token":"'
+_TOKEN_SUFFIX = b'","token_type":"bearer","expires_in":'
+
+
+def token_json(access_token: str, refresh_token: str, expires_in: int) -> bytes:
+    """Cuerpo JSON equivalente a `schemas.Token`, sin pasar por Pydantic."""
+    return b"".join((
+        _TOKEN_PREFIX, access_token.encode("ascii"),
+        _TOKEN_MIDDLE, refresh_token.encode("ascii"),
+        _TOKEN_SUFFIX, str(int(expires_in)).encode("ascii"), b"}",
+    ))
+
+
+def user_json(user) -> bytes:
+    """Cuerpo JSON equivalente a `schemas.UserInDB` desde el modelo ORM o el esquema."""
+    return dumps({"username": user.username, "id": user.id, "created_at": user.created_at})
+
+
+def token_response(access_token: str, refresh_token: str, expires_in: int) -> Response:
+    return Response(token_json(access_token, refresh_token, expires_in), media_type="application/json")
+
+
+def user_response(user, status_code: int = 200) -> Response:
+    return Response(user_json(user), status_code=status_code, media_type="application/json")
@@ -1,45 +1,275 @@
 """
-Servidor web simple para servir el frontend.
-Ejecutar: python serve_frontend.py
-"""
+Servidor web para el frontend (`frontend/`).
+
+Al arrancar lee el directorio una vez y prepara cada fichero:
+- ETag con el hash del contenido: el navegador revalida y recibe 304 sin cuerpo.
+- Variantes gzip y brotli (si está instalado el paquete `brotli`) de los ficheros de
+  texto, negociadas con Accept-Encoding. Solo se guardan si ocupan menos que el original.
+- Los ficheros pequeños se sirven desde memoria; los grandes, con sendfile desde disco.
+- Los HTML referencian los assets locales como `main.js?v=<hash>`. Esas URLs cambian con
+  el contenido, así que se cachean un año (immutable); el HTML se revalida siempre.
+
+Con --dev (o FRONTEND_DEV=true) se lee del disco en cada petición y se envía no-store,
+como antes: los cambios se ven al recargar sin reiniciar el servidor.
 
+Ejecutar: python serve_frontend.py [--port 8001] [--dev]
+"""
+import argparse
+import gzip
+import hashlib
 import http.server
-import socketserver
+import mimetypes
 import os
+import posixpath
+import re
 from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
 
-PORT = 8001
-FRONTEND_DIR = Path(__file__).parent / "frontend"
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
 
-class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=str(FRONTEND_DIR), **kwargs)
+# --- CONFIGURACIÓN DEL SERVIDOR DE FRONTEND ---
+PORT = int(os.getenv("FRONTEND_PORT", "8001"))
+FRONTEND_DIR = Path(os.getenv("FRONTEND_DIR", Path(__file__).parent / "frontend"))
+FRONTEND_DEV = os.getenv("FRONTEND_DEV", "false").lower() in ("1", "true", "yes")
+# Hasta este tamaño el fichero se guarda en memoria; por encima se envía con sendfile
+FRONTEND_MEMORY_MAX_BYTES = int(os.getenv("FRONTEND_MEMORY_MAX_BYTES", str(256 * 1024)))
+# Por debajo de este tamaño no compensa comprimir (cabeceras y CPU del cliente)
+FRONTEND_COMPRESS_MIN_BYTES = int(os.getenv("FRONTEND_COMPRESS_MIN_BYTES", "1024"))
 
-    def end_headers(self):
-        # Agregar headers para evitar caching en desarrollo
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
-        super().end_headers()
+NO_STORE = "no-store, no-cache, must-revalidate, max-age=0"
+REVALIDATE = "no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
 
-if __name__ == "__main__":
-    os.chdir(FRONTEND_DIR)
-    
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
-        print(f"""
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+# Atributos href/src con rutas relativas locales (sin esquema, query ni fragmento)
+_ASSET_REF = re.compile(r'\b(href|src)="(?![a-z][a-z0-9+.-]*:|/|#)([^"?#]+)"', re.IGNORECASE)
+
+
+class StaticFile(NamedTuple):
+    path: Path
+    content_type: str
+    size: int
+    etag: str
+    version: str  # valor de ?v= con el que el asset se cachea como immutable
+    body: Optional[bytes]  # None: se envía desde disco con sendfile
+    encodings: Dict[str, bytes]  # "br" / "gzip" -> cuerpo comprimido
+
+
+def _content_type(path: Path) -> str:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _compress(data: bytes, content_type: str) -> Dict[str, bytes]:
+    if len(data) < FRONTEND_COMPRESS_MIN_BYTES or not content_type.startswith(_COMPRESSIBLE):
+        return {}
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {name: body for name, body in variants.items() if len(body) < len(data)}
+
+
+def load_file(path: Path, data: bytes = None, precompress: bool = True) -> StaticFile:
+    """Prepara un fichero; `data` sustituye al contenido en disco (HTML reescrito)."""
+    content_type = _content_type(path)
+    size = path.stat().st_size if data is None else len(data)
+    in_memory = data is not None or size <= FRONTEND_MEMORY_MAX_BYTES
+    digest = hashlib.sha256()
+    if data is None:
+        with open(path, "rb") as f:
+            if in_memory:
+                data = f.read()
+                digest.update(data)
+            else:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+    else:
+        digest.update(data)
+    version = digest.hexdigest()[:16]
+    encodings = _compress(data, content_type) if precompress and in_memory else {}
+    return StaticFile(path, content_type, size, f'"{version}"', version, data if in_memory else None, encodings)
+
+
+def build_catalog(root: Path, precompress: bool = True) -> Dict[str, StaticFile]:
+    """Indexa `root` por ruta URL ("/main.js"). Los HTML se procesan al final, ya versionados."""
+    root = root.resolve()
+    catalog = {}
+    pages = []
+    for path in sorted(root.rglob("*")):
+        if not path.is_file() or any(part.startswith(".") for part in path.relative_to(root).parts):
+            continue
+        url = "/" + path.relative_to(root).as_posix()
+        if path.suffix in (".html", ".htm"):
+            pages.append((url, path))
+        else:
+            catalog[url] = load_file(path, precompress=precompress)
+
+    for url, path in pages:
+        base = url.rsplit("/", 1)[0] + "/"
+
+        def versioned(match):
+            target = catalog.get(posixpath.normpath(base + match.group(2)))
+            if target is None:
+                return match.group(0)
+            return f'{match.group(1)}="{match.group(2)}?v={target.version}"'
+
+        html = _ASSET_REF.sub(versioned, path.read_text(encoding="utf-8"))
+        catalog[url] = load_file(path, html.encode("utf-8"), precompress=precompress)
+    return catalog
+
+
+def _etags(if_none_match: str) -> set:
+    return {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class FrontendHandler(http.server.BaseHTTPRequestHandler):
+    """Sirve el catálogo precalculado (o el disco en modo desarrollo) con keep-alive."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "FrontendServer"
+    root: Path = FRONTEND_DIR.resolve()
+    catalog: Dict[str, StaticFile] = {}
+    dev: bool = FRONTEND_DEV
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _lookup(self, url_path: str) -> Optional[StaticFile]:
+        # normpath descarta los ".." por encima de la raíz
+        normalized = "/" + posixpath.normpath(unquote(url_path)).lstrip("/")
+        if url_path.endswith("/"):
+            normalized = posixpath.join(normalized, "index.html")
+        url_path = normalized
+        if not self.dev:
+            return self.catalog.get(url_path)
+        # Desarrollo: se lee del disco en cada petición, sin salir de la raíz
+        path = (self.root / url_path.lstrip("/")).resolve()
+        if path.is_dir():
+            path = path / "index.html"
+        if self.root not in path.parents or not path.is_file():
+            return None
+        return load_file(path, precompress=False)
+
+    def _serve(self, send_body: bool):
+        url = urlsplit(self.path)
+        static = self._lookup(url.path)
+        if static is None:
+            self.send_error(404, "Not Found")
+            return
+
+        if self.dev:
+            cache_control = NO_STORE
+        elif parse_qs(url.query).get("v") == [static.version]:
+            cache_control = IMMUTABLE
+        else:
+            cache_control = REVALIDATE
+
+        if not self.dev and static.etag in _etags(self.headers.get("If-None-Match", "")):
+            self.send_response(304)
+            self.send_header("ETag", static.etag)
+            self.send_header("Cache-Control", cache_control)
+            self.end_headers()
+            return
+
+        body, encoding = static.body, None
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        for candidate in ("br", "gzip"):
+            if candidate in static.encodings and _accepts(accept_encoding, candidate):
+                body, encoding = static.encodings[candidate], candidate
+                break
+
+        self.send_response(200)
+        self.send_header("Content-Type", static.content_type)
+        self.send_header("Content-Length", str(len(body) if body is not None else static.size))
+        self.send_header("Cache-Control", cache_control)
+        if self.dev:
+            self.send_header("Pragma", "no-cache")
+            self.send_header("Expires", "0")
+        else:
+            self.send_header("ETag", static.etag)
+        if static.encodings:
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if not send_body:
+            return
+        if body is not None:
+            self.wfile.write(body)
+        else:
+            with open(static.path, "rb") as f:
+                self.connection.sendfile(f)
+
+    def log_request(self, code="-", size="-"):
+        # Fuera de desarrollo solo se registran los errores
+        if self.dev or (isinstance(code, int) and code >= 400):
+            super().log_request(code, size)
+
+
+class FrontendServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(host: str, port: int, root: Path = FRONTEND_DIR, dev: bool = FRONTEND_DEV) -> FrontendServer:
+    root = Path(root).resolve()
+    handler = type("Handler", (FrontendHandler,), {
+        "root": root,
+        "dev": dev,
+        "catalog": {} if dev else build_catalog(root),
+    })
+    return FrontendServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--dev", action="store_true", default=FRONTEND_DEV, help="Sin caché: lee del disco en cada petición")
+    args = parser.parse_args()
+
+    httpd = make_server(args.host, args.port, FRONTEND_DIR, args.dev)
+    catalog = httpd.RequestHandlerClass.catalog
+    mode = "desarrollo (no-store)" if args.dev else (
+        f"{len(catalog)} ficheros, compresión: gzip{' + brotli' if brotli is not None else ''}"
+    )
+    print(f"""
 ╔══════════════════════════════════════════════════════╗
 ║        Frontend Server - Servidor Web Local          ║
 ╠══════════════════════════════════════════════════════╣
 ║                                                      ║
-║  🌐 URL: http://127.0.0.1:{PORT}                   ║
+║  🌐 URL: http://127.0.0.1:{args.port}                   ║
 ║  📁 Directorio: {FRONTEND_DIR}
+║  ⚙  Modo: {mode}
 ║                                                      ║
 ║  ✓ Presiona Ctrl+C para detener el servidor        ║
 ║                                                      ║
 ╚══════════════════════════════════════════════════════╝
         """)
-        
+
+    with httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n\n✓ Servidor detenido correctamente")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Lanzador de producción: uvicorn con varios workers dimensionados para este host.
+
+- Workers: uno por núcleo, salvo que el hashing de contraseñas ya ocupe varios núcleos por
+  worker. Hilos de Argon2 en total ≈ workers × HASHING_WORKERS × ARGON2_PARALLELISM ≈ núcleos,
+  para que los logins no compitan por la CPU con los event loops. WEB_CONCURRENCY fija el
+  número de workers y HASHING_WORKERS el de hilos por worker; lo que no se fije se calcula.
+- uvloop y httptools si están instalados (uvicorn[standard]); si no, asyncio y h11.
+- El proceso padre aplica las migraciones del esquema una sola vez antes de arrancar los
+  workers, que arrancan con STARTUP_SCHEMA=skip (ver startup.py).
+- Reciclado: cada worker termina tras SERVER_MAX_REQUESTS peticiones (± jitter para que no
+  se reinicien todos a la vez) y el padre lo sustituye. `kill -HUP <pid del padre>` reinicia
+  los workers uno a uno sin cerrar el socket (recarga sin cortes).
+- Keep-alive por encima del timeout de inactividad del proxy/balanceador: así es el proxy
+  quien cierra las conexiones ociosas y nunca reutiliza una que el servidor acaba de cerrar.
+
+Ejecutar: python server.py [--workers N] [--port 8000] [--reload] [--dry-run]
+"""
+import argparse
+import asyncio
+import importlib.util
+import inspect
+import logging
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import uvicorn
+
+logger = logging.getLogger("uvicorn.error")
+
+# --- CONFIGURACIÓN DEL SERVIDOR ---
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+RELOAD = os.getenv("RELOAD", "false").lower() in ("1", "true", "yes")
+# Conexiones pendientes de accept(); el kernel lo limita además a net.core.somaxconn
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Mayor que el keepalive_timeout del proxy (nginx: 60-65 s) o el idle timeout del balanceador
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "75"))
+# 0 = sin reciclado de workers
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "0"))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+# IPs de proxies de confianza para X-Forwarded-For (la IP real alimenta el freno de login)
+SERVER_FORWARDED_ALLOW_IPS = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def _env_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def plan_workers(cpu_count: int, web_concurrency: int = None, hashing_workers: int = None,
+                 argon2_parallelism: int = 1):
+    """Devuelve (workers, hilos de hashing por worker) para `cpu_count` núcleos."""
+    cpu_count = max(1, cpu_count)
+    threads_per_hash = max(1, argon2_parallelism)
+    if web_concurrency:
+        workers = web_concurrency
+    elif hashing_workers:
+        workers = max(1, cpu_count // (hashing_workers * threads_per_hash))
+    else:
+        workers = max(1, cpu_count // threads_per_hash)
+    if not hashing_workers:
+        hashing_workers = max(1, cpu_count // (workers * threads_per_hash))
+    return workers, hashing_workers
+
+
+def _available_cpus() -> int:
+    # Respeta la afinidad de CPU (taskset, cpusets de contenedores)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _default_argon2_parallelism() -> int:
+    # Sin ARGON2_PARALLELISM, auth.py usa el valor por defecto de passlib
+    from passlib.hash import argon2
+    return argon2.parallelism
+
+
+def _pick(module: str, preferred: str, fallback: str) -> str:
+    return preferred if importlib.util.find_spec(module) is not None else fallback
+
+
+def build_options(args) -> dict:
+    """Argumentos de uvicorn.run para la aplicación `main:app`."""
+    options = dict(
+        host=args.host,
+        port=args.port,
+        workers=1 if args.reload else args.workers,
+        reload=args.reload,
+        loop=_pick("uvloop", "uvloop", "asyncio"),
+        http=_pick("httptools", "httptools", "h11"),
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=SERVER_MAX_REQUESTS or None,
+        proxy_headers=True,
+        forwarded_allow_ips=SERVER_FORWARDED_ALLOW_IPS,
+    )
+    # El jitter del reciclado solo existe en versiones recientes de uvicorn
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+        options["limit_max_requests_jitter"] = SERVER_MAX_REQUESTS_JITTER
+    return options
+
+
+async def _bootstrap_schema():
+    # Importación diferida: solo el padre toca la base de datos antes de crear los workers
+    import database
+    from startup import ensure_schema
+    try:
+        await ensure_schema(database.engine)
+    finally:
+        await database.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=_env_int("WEB_CONCURRENCY"), help="Por defecto, calculado por núcleos")
+    parser.add_argument("--reload", action="store_true", default=RELOAD, help="Un worker con recarga al cambiar el código (desarrollo)")
+    parser.add_argument("--dry-run", action="store_true", help="Muestra la configuración calculada y sale")
+    args = parser.parse_args()
+    args.workers, hashing_workers = plan_workers(
+        _available_cpus(),
+        web_concurrency=args.workers,
+        hashing_workers=_env_int("HASHING_WORKERS"),
+        argon2_parallelism=_env_int("ARGON2_PARALLELISM") or _default_argon2_parallelism(),
+    )
+
+    # Los workers heredan el entorno: hilos de hashing calculados y esquema ya resuelto
+    os.environ["HASHING_WORKERS"] = str(hashing_workers)
+    options = build_options(args)
+    config = uvicorn.Config("main:app", **options)  # también configura el logging de uvicorn
+    logger.info(
+        "Servidor: %d worker(s) x %d hilo(s) de hashing, loop=%s, http=%s, backlog=%d, keep-alive=%ds, reciclado=%s",
+        config.workers, hashing_workers, config.loop, config.http, config.backlog,
+        config.timeout_keep_alive, config.limit_max_requests or "no",
+    )
+    if args.dry_run:
+        return
+
+    if os.getenv("STARTUP_SCHEMA", "auto") != "skip":
+        asyncio.run(_bootstrap_schema())
+        os.environ["STARTUP_SCHEMA"] = "skip"
+
+    uvicorn.run("main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Arranque del servicio: esquema de base de datos y fases medidas.
+
+- El esquema lleva una versión (tabla `schema_version`). Si ya está al día, cada worker lo
+  comprueba con una consulta y no ejecuta DDL. Si no, el primero que obtiene el advisory
+  lock de PostgreSQL aplica las migraciones pendientes en una transacción; el resto espera
+  al lock, vuelve a leer la versión y no repite nada. En SQLite (desarrollo y tests, un solo
+  proceso) no hay advisory locks y basta con la transacción.
+- Cada fase del arranque (imports, esquema, pool, calentamientos) se cronometra y se
+  resume en una línea de log y en la métrica `startup_phase_seconds`.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlalchemy import inspect, select, text, update
+
+import models
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DEL ARRANQUE ---
+# "auto" migra el esquema si hace falta; "skip" lo deja a otro proceso (p. ej. server.py)
+STARTUP_SCHEMA = os.getenv("STARTUP_SCHEMA", "auto")
+# Conexiones del pool (primario y réplicas) que se abren antes de aceptar tráfico
+STARTUP_POOL_CONNECTIONS = int(os.getenv("STARTUP_POOL_CONNECTIONS", "2"))
+# Carga Argon2 en el pool de hashing y la ruta JWT antes de la primera petición
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() not in ("0", "false", "no")
+
+# Clave del advisory lock de PostgreSQL (cualquier bigint fijo y propio de la aplicación)
+SCHEMA_LOCK_KEY = 7_262_001
+
+
+def _create_tables(conn):
+    # Solo crea las tablas que faltan; las existentes se migran en los pasos siguientes
+    models.Base.metadata.create_all(conn)
+
+
+def _add_token_generation(conn):
+    # Bases creadas antes de la rotación de refresh tokens
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "token_generation" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN token_generation INTEGER NOT NULL DEFAULT 0"))
+
+
+# (versión, migración): se aplican en orden las posteriores a la versión guardada
+MIGRATIONS = [
+    (1, _create_tables),
+    (2, _add_token_generation),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def _read_version(conn) -> int:
+    if not inspect(conn).has_table(models.SchemaVersion.__tablename__):
+        return 0
+    return conn.execute(select(models.SchemaVersion.version)).scalar() or 0
+
+
+def _migrate(conn) -> int:
+    """Aplica las migraciones pendientes; se ejecuta con el lock tomado."""
+    current = _read_version(conn)
+    if current >= SCHEMA_VERSION:
+        return current
+    for version, migration in MIGRATIONS:
+        if version > current:
+            logger.info("Aplicando migración de esquema %d (%s)", version, migration.__name__.lstrip("_"))
+            migration(conn)
+    table = models.SchemaVersion.__table__
+    if current == 0:
+        conn.execute(table.insert().values(id=1, version=SCHEMA_VERSION))
+    else:
+        conn.execute(update(table).values(version=SCHEMA_VERSION))
+    return current
+
+
+async def ensure_schema(engine) -> bool:
+    """Deja el esquema en SCHEMA_VERSION. Devuelve True si este proceso ejecutó DDL."""
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_read_version)
+    if current > SCHEMA_VERSION:
+        logger.warning("Esquema en versión %d, más nueva que la de este código (%d)", current, SCHEMA_VERSION)
+    if current >= SCHEMA_VERSION:
+        return False
+
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Se libera al terminar la transacción, junto con el DDL
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        previous = await conn.run_sync(_migrate)
+    if previous >= SCHEMA_VERSION:
+        return False
+    logger.info("Esquema actualizado de la versión %d a la %d", previous, SCHEMA_VERSION)
+    return True
+
+
+class StartupReport:
+    """Duración de cada fase del arranque, en el orden en que terminaron."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.total = None
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def finish(self, version: str, started: float):
+        """Cierra el informe; `started` es el perf_counter del inicio de los imports."""
+        self.total = time.perf_counter() - started
+        logger.info(
+            "Arranque completado en %.3fs (versión %s, pid %d): %s",
+            self.total, version, os.getpid(),
+            ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items()),
+        )
+
+    def as_metric(self) -> dict:
+        values = {(name,): seconds for name, seconds in self.phases.items()}
+        if self.total is not None:
+            values[("total",)] = self.total
+        return values
+
+
+startup_report = StartupReport()
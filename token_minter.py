@@ -0,0 +1,82 @@
+"""
+Emisión rápida de JWT para /token y /refresh.
+
+Frente a `jose.jwt.encode` por token:
+- La cabecera es constante: se codifica una vez al crear el minter.
+- La clave HMAC se prepara una vez y cada firma parte de una copia (`hmac.copy()`).
+- El par access/refresh se emite en una pasada, con una sola lectura del reloj.
+- Se reutiliza un JSONEncoder compacto en lugar de crear uno en cada `json.dumps`.
+
+Los tokens HS* son idénticos byte a byte a los de python-jose (mismas cabeceras y JSON),
+así que la verificación existente no cambia. Con claves asimétricas firma el keyring.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from calendar import timegm
+from datetime import datetime
+from typing import Optional, Tuple
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+# Mismo formato que python-jose: compacto y con ensure_ascii
+_encoder = json.JSONEncoder(separators=(",", ":"))
+_header_encoder = json.JSONEncoder(separators=(",", ":"), sort_keys=True)
+
+
+def _b64(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+class TokenMinter:
+    """Firma JWT con la cabecera precodificada y la clave preparada."""
+
+    def __init__(self, secret_key: str, algorithm: str = "HS256", keyring=None):
+        if keyring is not None:
+            header = keyring.header
+            self._sign = keyring.sign_bytes
+        else:
+            if algorithm not in _HMAC_DIGESTS:
+                raise ValueError(f"Algoritmo no soportado por el minter: {algorithm}")
+            header = {"alg": algorithm, "typ": "JWT"}
+            self._hmac = hmac.new(secret_key.encode("utf-8"), digestmod=_HMAC_DIGESTS[algorithm])
+            self._sign = self._hmac_sign
+        self.algorithm = algorithm
+        self._header_prefix = _b64(_header_encoder.encode(header).encode("utf-8")) + b"."
+
+    def _hmac_sign(self, signing_input: bytes) -> bytes:
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def _encode_payload(self, payload: dict) -> str:
+        signing_input = self._header_prefix + _b64(_encoder.encode(payload).encode("utf-8"))
+        return (signing_input + b"." + _b64(self._sign(signing_input))).decode("ascii")
+
+    def encode(self, claims: dict) -> str:
+        """Equivalente a `jwt.encode(claims, key, algorithm)` sin modificar `claims`."""
+        payload = dict(claims)
+        for name in ("exp", "iat", "nbf"):
+            value = payload.get(name)
+            if isinstance(value, datetime):
+                payload[name] = timegm(value.utctimetuple())
+        return self._encode_payload(payload)
+
+    def mint_pair(
+        self,
+        subject: str,
+        access_ttl: int,
+        refresh_ttl: int,
+        access_claims: Optional[dict] = None,
+        refresh_claims: Optional[dict] = None,
+    ) -> Tuple[str, str]:
+        """Emite (access_token, refresh_token) para `subject`; TTL en segundos."""
+        now = int(time.time())
+        access = {"sub": subject, "exp": now + access_ttl}
+        if access_claims:
+            access.update(access_claims)
+        refresh = {"sub": subject, "exp": now + refresh_ttl, "type": "refresh"}
+        if refresh_claims:
+            refresh.update(refresh_claims)
+        return self._encode_payload(access), self._encode_payload(refresh)
@@ -0,0 +1,106 @@
+"""
+Caché de perfiles de usuario (id, username, created_at) delante de las lecturas de crud.
+El backend es intercambiable: memoria del proceso (por defecto), Redis compartido o ninguno.
+"""
+import os
+from typing import Optional
+
+import schemas
+from cache import LRUCache
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DE LA CACHÉ DE PERFILES ---
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "memory")  # memory | redis | none
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_REDIS_URL = os.getenv("USER_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryProfileBackend:
+    """Backend en memoria del proceso: LRU con TTL y tamaño máximo."""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, username: str) -> Optional[schemas.UserInDB]:
+        return self._cache.get(username)
+
+    async def set(self, username: str, profile: schemas.UserInDB):
+        self._cache.set(username, profile)
+
+    async def delete(self, username: str):
+        self._cache.delete(username)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class RedisProfileBackend:
+    """Backend compartido entre procesos y réplicas usando Redis (requiere el paquete `redis`)."""
+
+    def __init__(self, url: str = USER_CACHE_REDIS_URL, ttl: float = USER_CACHE_TTL, prefix: str = "user:"):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("USER_CACHE_BACKEND=redis requiere instalar el paquete 'redis'")
+        self._client = redis_asyncio.from_url(url)
+        self.ttl = max(1, int(ttl))
+        self.prefix = prefix
+
+    async def get(self, username: str) -> Optional[schemas.UserInDB]:
+        # Un fallo de Redis no debe tumbar la petición: se trata como un miss
+        try:
+            raw = await self._client.get(self.prefix + username)
+        except Exception as exc:
+            logger.warning("Error leyendo la caché de perfiles: %s", exc)
+            return None
+        if raw is None:
+            return None
+        return schemas.UserInDB.model_validate_json(raw)
+
+    async def set(self, username: str, profile: schemas.UserInDB):
+        try:
+            await self._client.set(self.prefix + username, profile.model_dump_json(), ex=self.ttl)
+        except Exception as exc:
+            logger.warning("Error escribiendo la caché de perfiles: %s", exc)
+
+    async def delete(self, username: str):
+        try:
+            await self._client.delete(self.prefix + username)
+        except Exception as exc:
+            logger.warning("Error invalidando la caché de perfiles: %s", exc)
+
+    def stats(self) -> dict:
+        return {}
+
+
+class NullProfileBackend:
+    """Backend que no guarda nada (caché desactivada)."""
+
+    async def get(self, username: str) -> Optional[schemas.UserInDB]:
+        return None
+
+    async def set(self, username: str, profile: schemas.UserInDB):
+        pass
+
+    async def delete(self, username: str):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+def build_backend(kind: str = USER_CACHE_BACKEND):
+    """Construye el backend de caché indicado por configuración."""
+    if kind == "memory":
+        return MemoryProfileBackend()
+    if kind == "redis":
+        return RedisProfileBackend()
+    if kind == "none":
+        return NullProfileBackend()
+    raise ValueError(f"USER_CACHE_BACKEND inválido: {kind}")
+
+
+profile_cache = build_backend()
@@ -0,0 +1,140 @@
+"""
+Índice en memoria de los nombres de usuario existentes (filtro de Bloom).
+
+Se construye al arrancar leyendo la tabla `users` en streaming y se actualiza en cada alta.
+Un negativo permite ahorrar consultas:
+- /register se salta el SELECT previo al INSERT (la restricción UNIQUE cubre las carreras).
+- /token no consulta la base para usuarios inexistentes (con verificación Argon2 ficticia
+  para que el tiempo de respuesta no revele si el usuario existe).
+
+Con varios workers, otro proceso puede haber creado el usuario después de la última
+actualización. Por eso, ante un negativo en el login se hace una puesta al día con las
+filas nuevas (USERNAME_INDEX_CATCHUP), como mucho una vez cada
+USERNAME_INDEX_CATCHUP_INTERVAL segundos por worker. El negativo solo es definitivo tras
+una puesta al día hecha para esa petición; si se omite (por el intervalo o porque ya hay
+una en curso), el login hace el SELECT normal. El intervalo limita el trabajo, nunca decide
+la respuesta. Con un único proceso escritor se puede desactivar y el negativo es definitivo.
+"""
+import asyncio
+import os
+import time
+from typing import AsyncIterable, Awaitable, Callable, Iterable, Tuple
+
+from bloom import BloomFilter
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- CONFIGURACIÓN DEL ÍNDICE DE USUARIOS ---
+USERNAME_INDEX_ENABLED = os.getenv("USERNAME_INDEX_ENABLED", "true").lower() not in ("0", "false", "no")
+USERNAME_INDEX_CAPACITY = int(os.getenv("USERNAME_INDEX_CAPACITY", "1000000"))
+USERNAME_INDEX_ERROR_RATE = float(os.getenv("USERNAME_INDEX_ERROR_RATE", "0.01"))
+USERNAME_INDEX_CATCHUP = os.getenv("USERNAME_INDEX_CATCHUP", "true").lower() not in ("0", "false", "no")
+# Separación mínima entre puestas al día; los negativos intermedios no consultan la base
+USERNAME_INDEX_CATCHUP_INTERVAL = float(os.getenv("USERNAME_INDEX_CATCHUP_INTERVAL", "1"))
+# Los ids se asignan al insertar pero se confirman en otro orden (y las secuencias dejan
+# huecos, así que no hay un máximo "contiguo" fiable): se relee un margen amplio de filas
+USERNAME_INDEX_CATCHUP_OVERLAP = int(os.getenv("USERNAME_INDEX_CATCHUP_OVERLAP", "1000"))
+
+Row = Tuple[int, str]
+
+
+class UsernameIndex:
+    """Pertenencia aproximada de usernames; hasta completar `build` responde siempre "quizá"."""
+
+    def __init__(
+        self,
+        capacity: int = USERNAME_INDEX_CAPACITY,
+        error_rate: float = USERNAME_INDEX_ERROR_RATE,
+        enabled: bool = USERNAME_INDEX_ENABLED,
+        catchup: bool = USERNAME_INDEX_CATCHUP,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.enabled = enabled
+        self.catchup_enabled = catchup
+        self.ready = False
+        self.last_id = 0
+        self._filter = BloomFilter(capacity, error_rate)
+        self._pending = None  # altas ocurridas durante un build
+        self._catchup_task = None
+        self._catchup_started = float("-inf")
+
+    def might_exist(self, username: str) -> bool:
+        if not (self.enabled and self.ready):
+            return True
+        return username in self._filter
+
+    def add(self, username: str, user_id: int = 0):
+        self._filter.add(username)
+        self.last_id = max(self.last_id, user_id or 0)
+        if self._pending is not None:
+            self._pending.append((user_id, username))
+
+    def _apply(self, rows: Iterable[Row]):
+        for user_id, username in rows:
+            # La relectura con margen repite filas: no inflar el contador del filtro
+            if username not in self._filter:
+                self._filter.add(username)
+            self.last_id = max(self.last_id, user_id)
+
+    async def build(self, rows: AsyncIterable[Row]):
+        """Reconstruye el filtro a partir de todas las filas (id, username)."""
+        if not self.enabled:
+            return
+        start = time.perf_counter()
+        self._pending = []
+        new_filter, last_id = BloomFilter(self.capacity, self.error_rate), 0
+        try:
+            async for user_id, username in rows:
+                new_filter.add(username)
+                last_id = max(last_id, user_id)
+        except BaseException:
+            self._pending = None
+            raise
+        # Altas hechas en este proceso mientras se leía la tabla
+        for user_id, username in self._pending:
+            new_filter.add(username)
+            last_id = max(last_id, user_id or 0)
+        self._pending = None
+        self._filter, self.last_id, self.ready = new_filter, last_id, True
+        if new_filter.saturated:
+            logger.warning(
+                "Índice de usuarios por encima de su capacidad (%d > %d): sube USERNAME_INDEX_CAPACITY",
+                new_filter.count, self.capacity,
+            )
+        logger.info("Índice de usuarios construido: %d usuarios en %.2fs", new_filter.count, time.perf_counter() - start)
+
+    async def catch_up(self, loader: Callable[[int], Awaitable[Iterable[Row]]]) -> bool:
+        """
+        Incorpora los usuarios creados por otros procesos. Devuelve True si el índice ya
+        refleja las altas confirmadas antes de la llamada (un negativo es definitivo) y False
+        si no se consultó para esta petición: hay una consulta en curso que empezó antes, o
+        la última empezó hace menos de USERNAME_INDEX_CATCHUP_INTERVAL segundos. Con False
+        el llamante debe consultar la base.
+        """
+        if not (self.enabled and self.ready):
+            return False
+        if not self.catchup_enabled:
+            return True
+        now = time.monotonic()
+        if self._catchup_task is not None or now - self._catchup_started < USERNAME_INDEX_CATCHUP_INTERVAL:
+            return False
+        self._catchup_started = now
+        task = self._catchup_task = asyncio.ensure_future(self._load_new(loader))
+        task.add_done_callback(self._clear_catchup)
+        await asyncio.shield(task)
+        return True
+
+    def _clear_catchup(self, task):
+        if self._catchup_task is task:
+            self._catchup_task = None
+
+    async def _load_new(self, loader):
+        self._apply(await loader(max(0, self.last_id - USERNAME_INDEX_CATCHUP_OVERLAP)))
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "items": self._filter.count, "bits": self._filter.num_bits}
+
+
+username_index = UsernameIndex()